@@ -0,0 +1,204 @@
+"""Channel metrics over many multipaths at once, computed with numpy and without any plotting."""
+from __future__ import annotations
+
+try:
+    import numpy as np
+    from multipatprop import System, Multipath
+    from store import StoredMultipath
+
+
+    class Channels:
+        """The paths of many multipaths as flat arrays, every path labelled with the index of its multipath."""
+
+        number: int
+        owners: np.ndarray
+        delays: np.ndarray
+        powers: np.ndarray
+        weights: np.ndarray
+        delay_spreads: np.ndarray
+        angles: np.ndarray
+        orders: np.ndarray
+        hit_owners: np.ndarray | None
+        hit_interferers: np.ndarray | None
+        hit_powers: np.ndarray | None
+
+        def __init__(
+            self, multipaths: list[Multipath], systems: list[System] | None = None
+        ) -> None:
+            """Collects the paths of the multipaths, the systems are needed to find the contribution of interferers."""
+            self.number = len(multipaths)
+            columns = {
+                column: []
+                for column in (
+                    "owners",
+                    "delays",
+                    "powers",
+                    "weights",
+                    "delay_spreads",
+                    "angles",
+                    "orders",
+                )
+            }
+            hits = {column: [] for column in ("owners", "interferers", "powers")}
+            for m, multipath in enumerate(multipaths):
+                if isinstance(multipath, StoredMultipath):
+                    # a stored multipath already has its columns, the paths stay on disk
+                    paths = multipath.paths
+                    ends = paths.columns["ends"][:, 0]
+                    starts = np.concatenate(([0], ends[:-1]))
+                    points = paths.columns["points"]
+                    # the leg passing the receiver, before the hit past it for ray traced paths
+                    past = paths.columns["past_receivers"][:, 0].astype(bool)
+                    last = np.where(
+                        past[:, None],
+                        points[ends - 2] - points[np.maximum(ends - 3, 0)],
+                        points[ends - 1] - points[ends - 2],
+                    )
+                    columns["owners"].append(np.full(len(ends), m))
+                    columns["delays"].append(np.asarray(multipath.delays))
+                    columns["powers"].append(np.asarray(multipath.powers))
+                    columns["weights"].append(np.asarray(multipath.weights))
+                    columns["delay_spreads"].append(paths.columns["delay_spreads"][:, 0])
+                    columns["angles"].append(np.arctan2(last[:, 1], last[:, 0]))
+                    columns["orders"].append(ends - starts - 2)
+                    if systems is not None:
+                        orders = ends - starts - 2
+                        hit_paths = np.repeat(np.arange(len(ends)), orders)
+                        hits["owners"].append(np.full(len(hit_paths), m))
+                        hits["interferers"].append(paths.columns["segments"][:, 0])
+                        hits["powers"].append(
+                            (multipath.powers * multipath.weights)[hit_paths]
+                        )
+                    continue
+                path_list = list(multipath)
+                columns["owners"].append(np.full(len(path_list), m))
+                columns["delays"].append(np.array([path.delay for path in path_list]))
+                columns["powers"].append(np.array([path.power for path in path_list]))
+                columns["weights"].append(np.array([path.weight for path in path_list]))
+                columns["delay_spreads"].append(
+                    np.array([path.delay_spread for path in path_list])
+                )
+                columns["angles"].append(np.array([path.arrival_angle() for path in path_list]))
+                columns["orders"].append(np.array([len(path.hits) for path in path_list]))
+                if systems is not None:
+                    interferer_index = systems[m].get_interferer_index()
+                    interferers = []
+                    powers = []
+                    for path in path_list:
+                        for hit in path.hits:
+                            interferers.append(interferer_index(hit))
+                            powers.append(path.power * path.weight)
+                    hits["owners"].append(np.full(len(interferers), m))
+                    hits["interferers"].append(np.array(interferers))
+                    hits["powers"].append(np.array(powers))
+            self.owners = np.concatenate(columns["owners"] or [[]]).astype(np.int64)
+            self.delays = np.concatenate(columns["delays"] or [[]]).astype(np.float64)
+            self.powers = np.concatenate(columns["powers"] or [[]]).astype(np.float64)
+            self.weights = np.concatenate(columns["weights"] or [[]]).astype(np.float64)
+            self.delay_spreads = np.concatenate(columns["delay_spreads"] or [[]]).astype(
+                np.float64
+            )
+            self.angles = np.concatenate(columns["angles"] or [[]]).astype(np.float64)
+            self.orders = np.concatenate(columns["orders"] or [[]]).astype(np.int64)
+            self.hit_owners = None
+            self.hit_interferers = None
+            self.hit_powers = None
+            if systems is not None:
+                self.hit_owners = np.concatenate(hits["owners"] or [[]]).astype(np.int64)
+                self.hit_interferers = np.concatenate(hits["interferers"] or [[]]).astype(
+                    np.int64
+                )
+                self.hit_powers = np.concatenate(hits["powers"] or [[]]).astype(np.float64)
+
+        def sum(self, values: np.ndarray) -> np.ndarray:
+            """Sums values of the paths for every multipath."""
+            return np.bincount(self.owners, weights=values, minlength=self.number)
+
+        def total_powers(self) -> np.ndarray:
+            """Finds the received power of every multipath, aggregated paths count with their weight."""
+            return self.sum(self.powers * self.weights)
+
+        def first_delays(self) -> np.ndarray:
+            """Finds the delay of the first arrival of every multipath, infinite without paths."""
+            first = np.full(self.number, np.inf)
+            np.minimum.at(first, self.owners, self.delays)
+            return first
+
+
+    def mean_excess_delays(channels: Channels) -> np.ndarray:
+        """Finds the power weighted mean delay after the first arrival of every multipath, nan without paths."""
+        powers = channels.powers * channels.weights
+        excess = channels.delays - channels.first_delays()[channels.owners]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return channels.sum(powers * excess) / channels.total_powers()
+
+
+    def rms_delay_spreads(channels: Channels) -> np.ndarray:
+        """Finds the power weighted standard deviation of the delays of every multipath, nan without paths.
+        Aggregated paths add their own delay spread."""
+        powers = channels.powers * channels.weights
+        mean = mean_excess_delays(channels)
+        excess = channels.delays - channels.first_delays()[channels.owners]
+        deviations = (excess - mean[channels.owners]) ** 2 + channels.delay_spreads**2
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance = channels.sum(powers * deviations)
+            return np.sqrt(variance / channels.total_powers())
+
+
+    def angle_spreads(channels: Channels) -> np.ndarray:
+        """Finds the circular spread of the arrival angles of every multipath in radians, sqrt(-2 ln R)
+        where R is the length of the power weighted mean arrival direction, nan without paths."""
+        powers = channels.powers * channels.weights
+        with np.errstate(invalid="ignore", divide="ignore"):
+            x = channels.sum(powers * np.cos(channels.angles)) / channels.total_powers()
+            y = channels.sum(powers * np.sin(channels.angles)) / channels.total_powers()
+            length = np.minimum(np.hypot(x, y), 1)
+            return np.sqrt(-2 * np.log(length))
+
+
+    def k_factors(channels: Channels) -> np.ndarray:
+        """Finds the rician K-factor of every multipath, the power of the strongest path over the power of the others.
+        Infinite with a single path and nan without paths."""
+        powers = channels.powers * channels.weights
+        strongest = np.zeros(channels.number)
+        np.maximum.at(strongest, channels.owners, powers)
+        total = channels.total_powers()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            factors = strongest / (total - strongest)
+        factors[total == 0] = np.nan
+        return factors
+
+
+    def order_distributions(channels: Channels, max_order: int | None = None) -> np.ndarray:
+        """Finds the number of paths with every reflection order for every multipath, as rows of orders."""
+        if max_order is None:
+            max_order = int(channels.orders.max()) if len(channels.orders) > 0 else 0
+        stride = max_order + 1
+        orders = np.minimum(channels.orders, max_order)
+        counts = np.bincount(
+            channels.owners * stride + orders,
+            weights=channels.weights,
+            minlength=channels.number * stride,
+        )
+        return counts.reshape(channels.number, stride)
+
+
+    def interferer_contributions(channels: Channels, interferer_number: int) -> np.ndarray:
+        """Finds the power of the paths hitting every interferer for every multipath, as rows of interferers.
+        A path adds its power to each interferer it hits, once per hit."""
+        if channels.hit_owners is None:
+            raise ValueError("Channels need the systems to find the contribution of interferers")
+        contributions = np.bincount(
+            channels.hit_owners * interferer_number + channels.hit_interferers,
+            weights=channels.hit_powers,
+            minlength=channels.number * interferer_number,
+        )
+        return contributions.reshape(channels.number, interferer_number)
+
+
+    if __name__ == "__main__":
+        from time import sleep
+        print("This file is just a library, does not work on its own.")
+        sleep(5)
+except KeyboardInterrupt:
+    exit()
@@ -0,0 +1,314 @@
+"""A beam tracing engine that finds every reflection path from the transmitter to the receiver point exactly."""
+from __future__ import annotations
+
+try:
+    from collections import deque
+    from math import hypot
+    from multipatprop import System, Multipath, Path, Point, Interferer, Segment
+
+    # beams and visible intervals narrower than this are numerical noise
+    EPSILON = 1e-12
+
+
+    class Beam:
+        """A wedge of rays from an apex, the transmitter or its image behind the reflecting segment.
+        Directions from first to second are counterclockwise and the rays start at the reflecting segment."""
+
+        apex: tuple[float, float]
+        first: tuple[float, float]
+        second: tuple[float, float]
+        segment: Segment | None
+        interferer: Interferer | None
+        parent: Beam | None
+        depth: int
+
+        def __init__(
+            self,
+            apex: tuple[float, float],
+            first: tuple[float, float],
+            second: tuple[float, float],
+            segment: Segment | None = None,
+            interferer: Interferer | None = None,
+            parent: Beam | None = None,
+        ) -> None:
+            self.apex = apex
+            self.first = first
+            self.second = second
+            self.segment = segment
+            self.interferer = interferer
+            self.parent = parent
+            self.depth = 0 if parent is None else parent.depth + 1
+
+        def direction(self, t: float) -> tuple[float, float]:
+            """Finds the direction of the ray at t, from 0 at the first to 1 at the second boundary."""
+            return (
+                (1 - t) * self.first[0] + t * self.second[0],
+                (1 - t) * self.first[1] + t * self.second[1],
+            )
+
+        def locate(self, x: float, y: float) -> float | None:
+            """Finds t of the ray through a point, None if the point is outside the wedge or before the segment."""
+            dx = x - self.apex[0]
+            dy = y - self.apex[1]
+            a = cross(self.first[0], self.first[1], dx, dy)
+            b = cross(dx, dy, self.second[0], self.second[1])
+            if a <= 0 or b < 0 or self.behind(x, y) >= 0:
+                return None
+            return a / (a + b)
+
+        def behind(self, x: float, y: float) -> float:
+            """Positive if a point lies on the apex side of the reflecting segment, where the beam has no rays."""
+            if self.segment is None:
+                return -1
+            p = self.segment.p
+            v = self.segment.v
+            side = cross(v.x, v.y, x - p.x, y - p.y)
+            apex_side = cross(v.x, v.y, self.apex[0] - p.x, self.apex[1] - p.y)
+            return side * apex_side
+
+        def clip(self, segment: Segment) -> tuple[float, float] | None:
+            """Finds the part of a segment inside the wedge and past the reflecting segment, as segment parameters."""
+            p = segment.p
+            v = segment.v
+            lower = 0
+            upper = 1
+            constraints = []
+            dx_1 = p.x - self.apex[0]
+            dy_1 = p.y - self.apex[1]
+            dx_2 = dx_1 + v.x
+            dy_2 = dy_1 + v.y
+            constraints.append(
+                (
+                    cross(self.first[0], self.first[1], dx_1, dy_1),
+                    cross(self.first[0], self.first[1], dx_2, dy_2),
+                )
+            )
+            constraints.append(
+                (
+                    cross(dx_1, dy_1, self.second[0], self.second[1]),
+                    cross(dx_2, dy_2, self.second[0], self.second[1]),
+                )
+            )
+            if self.segment is not None:
+                constraints.append((-self.behind(p.x, p.y), -self.behind(p.x + v.x, p.y + v.y)))
+            # every constraint is linear along the segment and must not be negative
+            for c_1, c_2 in constraints:
+                if c_1 < 0 and c_2 < 0:
+                    return None
+                if c_1 < 0 or c_2 < 0:
+                    root = c_1 / (c_1 - c_2)
+                    if c_1 < 0:
+                        lower = max(lower, root)
+                    else:
+                        upper = min(upper, root)
+            if upper - lower < EPSILON:
+                return None
+            return lower, upper
+
+
+    def cross(ax: float, ay: float, bx: float, by: float) -> float:
+        return ax * by - ay * bx
+
+
+    def intersect(
+        apex: tuple[float, float], direction: tuple[float, float], segment: Segment
+    ) -> tuple[float, float] | None:
+        """Finds the ray and segment parameters where a ray from the apex crosses the line of a segment."""
+        v = segment.v
+        denominator = cross(direction[0], direction[1], v.x, v.y)
+        if denominator == 0:
+            return None
+        dx = segment.p.x - apex[0]
+        dy = segment.p.y - apex[1]
+        s = cross(dx, dy, v.x, v.y) / denominator
+        u = cross(dx, dy, direction[0], direction[1]) / denominator
+        return s, u
+
+
+    def mirror(x: float, y: float, segment: Segment) -> tuple[float, float]:
+        """Reflects a point across the line of a segment."""
+        p = segment.p
+        v = segment.v
+        length = hypot(v.x, v.y)
+        nx = -v.y / length
+        ny = v.x / length
+        distance = (x - p.x) * nx + (y - p.y) * ny
+        return x - 2 * distance * nx, y - 2 * distance * ny
+
+
+    def get_visible(
+        beam: Beam, segments: list[tuple[Segment, Interferer]]
+    ) -> tuple[list[tuple[Segment, Interferer, float, float]], list]:
+        """Finds the segments first hit by the rays of a beam, as intervals of t merged per segment.
+        Also returns the clipped pieces of every segment in the beam, which block the receiver."""
+        pieces = []
+        for segment, interferer in segments:
+            if segment is beam.segment:
+                continue
+            clipped = beam.clip(segment)
+            if clipped is None:
+                continue
+            ts = []
+            for u in clipped:
+                x = segment.p.x + u * segment.v.x
+                y = segment.p.y + u * segment.v.y
+                dx = x - beam.apex[0]
+                dy = y - beam.apex[1]
+                a = cross(beam.first[0], beam.first[1], dx, dy)
+                b = cross(dx, dy, beam.second[0], beam.second[1])
+                ts.append(max(min(a / (a + b), 1), 0) if a + b > 0 else 0)
+            pieces.append((segment, interferer, min(ts), max(ts)))
+
+        # the nearest segment only changes at ends of pieces or where pieces cross
+        critical = {0, 1}
+        for segment, interferer, t_1, t_2 in pieces:
+            critical.add(t_1)
+            critical.add(t_2)
+        for i, (segment_1, interferer_1, t_1, t_2) in enumerate(pieces):
+            for segment_2, interferer_2, t_3, t_4 in pieces[i + 1 :]:
+                if t_2 < t_3 or t_4 < t_1:
+                    continue
+                denominator = cross(segment_1.v.x, segment_1.v.y, segment_2.v.x, segment_2.v.y)
+                if denominator == 0:
+                    continue
+                dx = segment_2.p.x - segment_1.p.x
+                dy = segment_2.p.y - segment_1.p.y
+                u_1 = cross(dx, dy, segment_2.v.x, segment_2.v.y) / denominator
+                u_2 = cross(dx, dy, segment_1.v.x, segment_1.v.y) / denominator
+                if 0 <= u_1 <= 1 and 0 <= u_2 <= 1:
+                    t = beam.locate(
+                        segment_1.p.x + u_1 * segment_1.v.x, segment_1.p.y + u_1 * segment_1.v.y
+                    )
+                    if t is not None:
+                        critical.add(t)
+        critical = sorted(critical)
+
+        visible = []
+        for t_1, t_2 in zip(critical, critical[1:]):
+            if t_2 - t_1 < EPSILON:
+                continue
+            direction = beam.direction((t_1 + t_2) / 2)
+            nearest = None
+            nearest_s = 0
+            for segment, interferer, t_3, t_4 in pieces:
+                if not t_3 <= (t_1 + t_2) / 2 <= t_4:
+                    continue
+                intersection = intersect(beam.apex, direction, segment)
+                if intersection is not None and intersection[0] > 0:
+                    if nearest is None or intersection[0] < nearest_s:
+                        nearest = (segment, interferer)
+                        nearest_s = intersection[0]
+            if nearest is None:
+                continue
+            if visible and visible[-1][0] is nearest[0] and visible[-1][3] == t_1:
+                visible[-1] = (nearest[0], nearest[1], visible[-1][2], t_2)
+            else:
+                visible.append((nearest[0], nearest[1], t_1, t_2))
+        return visible, pieces
+
+
+    def get_receiver_path(
+        system: System, beam: Beam, pieces: list, power_multiplier: float
+    ) -> Path | None:
+        """Finds the path through the reflections of a beam to the receiver, if the beam reaches the receiver unblocked."""
+        receiver = system.receiver.position
+        t = beam.locate(receiver.x, receiver.y)
+        if t is None:
+            return None
+        receiver_distance = hypot(receiver.x - beam.apex[0], receiver.y - beam.apex[1])
+        direction = beam.direction(t)
+        length = hypot(*direction)
+        for segment, interferer, t_1, t_2 in pieces:
+            if not t_1 <= t <= t_2:
+                continue
+            intersection = intersect(beam.apex, direction, segment)
+            if intersection is None:
+                continue
+            s, u = intersection
+            if 0 <= u <= 1 and 0 < s * length < receiver_distance:
+                return None
+
+        # unfold the reflections from the receiver back to the transmitter
+        points = [receiver.copy()]
+        hits = []
+        segments = []
+        x, y = receiver.x, receiver.y
+        while beam.segment is not None:
+            direction = (x - beam.apex[0], y - beam.apex[1])
+            s, u = intersect(beam.apex, direction, beam.segment)
+            x = beam.apex[0] + s * direction[0]
+            y = beam.apex[1] + s * direction[1]
+            points.insert(0, Point(x, y))
+            hits.insert(0, beam.interferer)
+            segments.insert(0, beam.segment)
+            beam = beam.parent
+        points.insert(0, system.transmitter.position.copy())
+        path = Path(points, hits, power_multiplier, segments)
+        # the path ends at the receiver, there is no hit past it
+        path.past_receiver = False
+        return path
+
+
+    def get_multipath_beams(
+        system: System,
+        max_reflections: int,
+        power_multiplier: float = 0.9,
+        max_beams: int = 1000000,
+    ) -> Multipath:
+        """Finds every path from the transmitter to the receiver point with up to max_reflections reflections,
+        including the direct path, by splitting beams at the interferers they hit.
+        The starting number of the multipath is the number of beams traced, at most max_beams."""
+        segments = []
+        for interferer in system.interferers:
+            for segment in interferer.segments:
+                segments.append((segment, interferer))
+        transmitter = system.transmitter.position
+        apex = (transmitter.x, transmitter.y)
+        # four quarter wedges, so that every wedge spans less than half a turn
+        directions = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+        beams = deque(Beam(apex, directions[d], directions[(d + 1) % 4]) for d in range(4))
+        paths = []
+        beam_number = 0
+        print("Calculating propagated paths...", end="\r")
+        while beams:
+            beam = beams.popleft()
+            beam_number += 1
+            visible, pieces = get_visible(beam, segments)
+            path = get_receiver_path(system, beam, pieces, power_multiplier)
+            if path is not None:
+                paths.append(path)
+            if beam.depth < max_reflections:
+                for segment, interferer, t_1, t_2 in visible:
+                    window = []
+                    for t in (t_1, t_2):
+                        direction = beam.direction(t)
+                        s, u = intersect(beam.apex, direction, segment)
+                        window.append(
+                            (beam.apex[0] + s * direction[0], beam.apex[1] + s * direction[1])
+                        )
+                    image = mirror(beam.apex[0], beam.apex[1], segment)
+                    first = (window[0][0] - image[0], window[0][1] - image[1])
+                    second = (window[1][0] - image[0], window[1][1] - image[1])
+                    if cross(first[0], first[1], second[0], second[1]) < 0:
+                        first, second = second, first
+                    beams.append(Beam(image, first, second, segment, interferer, beam))
+            if beam_number >= max_beams:
+                print()
+                print(f"Stopped at {max_beams} beams, paths with more reflections may be missing")
+                break
+            print(
+                f"Calculating propagated paths... (number: {len(paths)}, beams: {beam_number}, reflections: {beam.depth})",
+                end="\r",
+            )
+        print()
+        paths.sort(key=lambda path: path.delay)
+        multipath = Multipath(paths, beam_number)
+        return multipath
+
+
+    if __name__ == "__main__":
+        from time import sleep
+        print("This file is just a library, does not work on its own.")
+        sleep(5)
+except KeyboardInterrupt:
+    exit()
@@ -0,0 +1,137 @@
+"""A command line program that traces a scene file and writes the results, for scripted batch runs."""
+from __future__ import annotations
+
+try:
+    import argparse
+    import json
+    from multipatprop import System, Multipath, Statistics, Point
+
+
+    def get_parser() -> argparse.ArgumentParser:
+        parser = argparse.ArgumentParser(
+            description="Trace the multipath propagation of a json scene file, see System.save."
+        )
+        parser.add_argument("scene", help="json scene file")
+        parser.add_argument("--starting-number", type=int, default=1000)
+        parser.add_argument("--receiver-diameter", type=float, default=0.2)
+        parser.add_argument("--max-reflections", type=int, default=40)
+        parser.add_argument("--power-multiplier", type=float, default=0.9)
+        parser.add_argument("--backend", default="python", help="python, numba or instanced")
+        parser.add_argument(
+            "--time-budget",
+            type=float,
+            help="seconds to trace for, starting angles are traced from coarse to fine",
+        )
+        parser.add_argument(
+            "--max-deviation",
+            type=float,
+            help="simplify the interferers so their outlines move at most this far",
+        )
+        parser.add_argument(
+            "--statistics",
+            action="store_true",
+            help="accumulate histograms and totals without keeping paths",
+        )
+        parser.add_argument("--bins", type=int, default=100)
+        parser.add_argument("--max-delay", type=float, default=1e-6)
+        parser.add_argument(
+            "--aggregate", action="store_true", help="collapse paths with the same reflections"
+        )
+        parser.add_argument("--output", help="json file for the results")
+        parser.add_argument("--store", help="directory of a path store to append the paths to")
+        parser.add_argument("--image", help="png file for a rendering of the paths")
+        parser.add_argument("--camera-x", type=float, default=0)
+        parser.add_argument("--camera-y", type=float, default=0)
+        parser.add_argument("--camera-zoom", type=float, default=0.1)
+        parser.add_argument("--ui-size", type=float, default=1)
+        parser.add_argument("--red-factor", type=float, default=1)
+        return parser
+
+
+    def describe(result: Multipath | Statistics, system: System) -> dict:
+        """Describes the totals of a result and the paths of a multipath with plain values."""
+        if isinstance(result, Statistics):
+            return {
+                "starting_number": result.starting_number,
+                "propagated_number": result.number,
+                "power": result.power(),
+                "statistics": result.to_dict(),
+            }
+        interferer_index = system.get_interferer_index()
+        paths = [
+            {
+                "points": [[point.x, point.y] for point in path.points],
+                "hits": [interferer_index(hit) for hit in path.hits],
+                "delay": path.delay,
+                "power": path.power,
+                "weight": path.weight,
+                "delay_spread": path.delay_spread,
+            }
+            for path in result
+        ]
+        return {
+            "starting_number": result.starting_number,
+            "propagated_number": sum(path["weight"] for path in paths),
+            "power": sum(path["power"] * path["weight"] for path in paths),
+            "paths": paths,
+        }
+
+
+    def main(arguments: list[str] | None = None) -> None:
+        parser = get_parser()
+        options = parser.parse_args(arguments)
+        if options.statistics and (options.aggregate or options.store or options.image):
+            parser.error("--statistics keeps no paths to aggregate, store or render")
+        if options.statistics and options.time_budget is not None:
+            parser.error("--time-budget only applies to multipaths")
+        system = System.load(options.scene, options.backend)
+        if options.max_deviation is not None:
+            from simplify import simplify_system
+
+            system = simplify_system(system, options.max_deviation)
+        if options.statistics:
+            result = system.get_statistics(
+                options.starting_number,
+                options.receiver_diameter,
+                options.max_reflections,
+                options.power_multiplier,
+                options.bins,
+                options.max_delay,
+            )
+        else:
+            result = system.get_multipath(
+                options.starting_number,
+                options.receiver_diameter,
+                options.max_reflections,
+                options.power_multiplier,
+                options.time_budget,
+            )
+            if options.aggregate:
+                result = result.aggregate()
+            if options.store is not None:
+                from store import MultipathWriter
+
+                with MultipathWriter(options.store, system) as writer:
+                    writer.write_multipath(result)
+            if options.image is not None:
+                # the rendering stack is only imported when an image is requested
+                from output import save_image
+
+                save_image(
+                    system,
+                    result,
+                    options.image,
+                    Point(options.camera_x, options.camera_y),
+                    options.camera_zoom,
+                    options.ui_size,
+                    options.red_factor,
+                )
+        if options.output is not None:
+            with open(options.output, "w") as file:
+                json.dump(describe(result, system), file)
+
+
+    if __name__ == "__main__":
+        main()
+except KeyboardInterrupt:
+    exit()
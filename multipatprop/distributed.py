@@ -0,0 +1,247 @@
+"""Work units that split the starting angles of a run so that parts can be traced anywhere and merged."""
+from __future__ import annotations
+
+try:
+    import json
+    from math import tau
+    from typing import Iterable
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from multipatprop import System, Multipath, Statistics, Path, Point
+
+
+    class WorkUnit:
+        """A range of the evenly distributed starting angles of a run, with everything needed to trace it."""
+
+        scene: str
+        starting_number: int
+        start: int
+        stop: int
+        receiver_diameter: float
+        max_reflections: int
+        power_multiplier: float
+        backend: str
+        statistics: dict | None
+
+        def __init__(
+            self,
+            scene: str,
+            starting_number: int,
+            start: int,
+            stop: int,
+            receiver_diameter: float,
+            max_reflections: int,
+            power_multiplier: float = 0.9,
+            backend: str = "python",
+            statistics: dict | None = None,
+        ) -> None:
+            self.scene = scene
+            self.starting_number = starting_number
+            self.start = start
+            self.stop = stop
+            self.receiver_diameter = receiver_diameter
+            self.max_reflections = max_reflections
+            self.power_multiplier = power_multiplier
+            self.backend = backend
+            # bins and max_delay of a statistics only run, None keeps the paths
+            self.statistics = statistics
+
+        def to_json(self) -> str:
+            return json.dumps(vars(self))
+
+        @classmethod
+        def from_json(cls, text: str) -> WorkUnit:
+            return cls(**json.loads(text))
+
+        def run(self, system: System | None = None) -> Partial:
+            """Traces the starting angles of the work unit, the system is loaded from the scene file if not given."""
+            if system is None:
+                system = System.load(self.scene, self.backend)
+            starting_angles = (
+                tau * (n / self.starting_number) for n in range(self.start, self.stop)
+            )
+            traced = system.get_paths(
+                starting_angles,
+                self.receiver_diameter,
+                self.max_reflections,
+                self.power_multiplier,
+            )
+            if self.statistics is not None:
+                statistics = Statistics(
+                    self.statistics["bins"],
+                    self.statistics["max_delay"],
+                    self.max_reflections,
+                    len(system.interferers),
+                    self.power_multiplier,
+                )
+                interferer_index = system.get_interferer_index()
+                for starting_angle, path in traced:
+                    if path is not None:
+                        statistics.add(path, [interferer_index(hit) for hit in path.hits])
+                statistics.starting_number = self.stop - self.start
+                return Partial(self.start, self.stop, statistics=statistics)
+            paths = [path for starting_angle, path in traced if path is not None]
+            return Partial(self.start, self.stop, Multipath(paths, self.stop - self.start))
+
+
+    class Partial:
+        """The result of one work unit, either the propagated paths or the statistics of its angle range."""
+
+        start: int
+        stop: int
+        multipath: Multipath | None
+        statistics: Statistics | None
+
+        def __init__(
+            self,
+            start: int,
+            stop: int,
+            multipath: Multipath | None = None,
+            statistics: Statistics | None = None,
+        ) -> None:
+            self.start = start
+            self.stop = stop
+            self.multipath = multipath
+            self.statistics = statistics
+
+        def to_json(self, system: System) -> str:
+            """Describes the result with interferers and segments as indices into the system."""
+            data = {"start": self.start, "stop": self.stop}
+            if self.statistics is not None:
+                data["statistics"] = self.statistics.to_dict()
+            if self.multipath is not None:
+                segment_index = system.get_segment_index()
+                data["paths"] = [
+                    {
+                        "points": [[point.x, point.y] for point in path.points],
+                        "segments": [
+                            list(segment_index(hit, segment))
+                            for hit, segment in zip(path.hits, path.segments)
+                        ],
+                    }
+                    for path in self.multipath.paths
+                ]
+            return json.dumps(data)
+
+        @classmethod
+        def from_json(cls, text: str, system: System, power_multiplier: float = 0.9) -> Partial:
+            """Rebuilds the result of a work unit of the system, the paths refer to its interferers again."""
+            data = json.loads(text)
+            partial = cls(data["start"], data["stop"])
+            if "statistics" in data:
+                partial.statistics = Statistics.from_dict(data["statistics"])
+            if "paths" in data:
+                paths = []
+                for path in data["paths"]:
+                    hits = [system.interferers[i] for i, s in path["segments"]]
+                    segments = [system.interferers[i].segments[s] for i, s in path["segments"]]
+                    points = [Point(x, y) for x, y in path["points"]]
+                    paths.append(Path(points, hits, power_multiplier, segments))
+                partial.multipath = Multipath(paths, partial.stop - partial.start)
+            return partial
+
+
+    def split(
+        scene: str,
+        starting_number: int,
+        unit_number: int,
+        receiver_diameter: float,
+        max_reflections: int,
+        power_multiplier: float = 0.9,
+        backend: str = "python",
+        statistics: dict | None = None,
+    ) -> list[WorkUnit]:
+        """Splits the starting angles of a run into a number of contiguous work units of similar size."""
+        units = []
+        for u in range(unit_number):
+            start = starting_number * u // unit_number
+            stop = starting_number * (u + 1) // unit_number
+            if start < stop:
+                units.append(
+                    WorkUnit(
+                        scene,
+                        starting_number,
+                        start,
+                        stop,
+                        receiver_diameter,
+                        max_reflections,
+                        power_multiplier,
+                        backend,
+                        statistics,
+                    )
+                )
+        return units
+
+
+    def merge(partials: Iterable[Partial], starting_number: int) -> Multipath | Statistics:
+        """Combines the results of work units in any order into the result of one run over every starting angle.
+        Paths keep the order of their starting angles, statistics sum in that order too."""
+        partials = sorted(partials, key=lambda partial: partial.start)
+        stop = 0
+        for partial in partials:
+            if partial.start != stop:
+                raise ValueError(f"Starting angles {stop} to {partial.start} are missing or overlap")
+            stop = partial.stop
+        if stop != starting_number:
+            raise ValueError(f"Starting angles {stop} to {starting_number} are missing")
+        if all(partial.statistics is not None for partial in partials):
+            statistics = partials[0].statistics
+            for partial in partials[1:]:
+                statistics.merge(partial.statistics)
+            return statistics
+        paths = []
+        for partial in partials:
+            paths += partial.multipath.paths
+        multipath = Multipath(paths, starting_number)
+        return multipath
+
+
+    def run_unit(text: str) -> str:
+        """Runs a work unit described in json and describes its result in json, as a worker process would."""
+        unit = WorkUnit.from_json(text)
+        system = System.load(unit.scene, unit.backend)
+        partial = unit.run(system)
+        return partial.to_json(system)
+
+
+    def run_local(
+        scene: str,
+        starting_number: int,
+        receiver_diameter: float,
+        max_reflections: int,
+        power_multiplier: float = 0.9,
+        backend: str = "python",
+        statistics: dict | None = None,
+        unit_number: int = 16,
+        processes: int | None = None,
+    ) -> Multipath | Statistics:
+        """Runs every work unit of a scene file in a local process pool, passing units and results as json."""
+        system = System.load(scene)
+        units = split(
+            scene,
+            starting_number,
+            unit_number,
+            receiver_diameter,
+            max_reflections,
+            power_multiplier,
+            backend,
+            statistics,
+        )
+        partials = []
+        with ProcessPoolExecutor(processes) as executor:
+            futures = [executor.submit(run_unit, unit.to_json()) for unit in units]
+            for future in as_completed(futures):
+                partials.append(Partial.from_json(future.result(), system, power_multiplier))
+                print(
+                    f"Calculating propagated paths... (work units: {len(partials)}/{len(units)})",
+                    end="\r",
+                )
+        print()
+        return merge(partials, starting_number)
+
+
+    if __name__ == "__main__":
+        from time import sleep
+        print("This file is just a library, does not work on its own.")
+        sleep(5)
+except KeyboardInterrupt:
+    exit()
@@ -0,0 +1,269 @@
+"""Interferers sharing template shapes, stored as transform arrays and traced in template space with backend="instanced"."""
+from __future__ import annotations
+
+try:
+    from math import sqrt
+    from typing import Iterable, Iterator
+    import numpy as np
+    from multipatprop import System, Interferer, Path, Point, Vector
+
+
+    class Template:
+        """A shape in local coordinates shared by many instances."""
+
+        points: np.ndarray
+        segments: np.ndarray
+        closed: bool
+        radius: float
+
+        def __init__(self, points: list[tuple[float, float]], closed: bool = True) -> None:
+            self.points = np.array(points, dtype=np.float64).reshape(-1, 2)
+            self.closed = closed
+            ends = np.roll(self.points, -1, axis=0) if closed else self.points[1:]
+            starts = self.points if closed else self.points[:-1]
+            # rows of start point and vector, like the euclid segments of an interferer
+            self.segments = np.hstack((starts, ends - starts))
+            self.radius = float(np.hypot(self.points[:, 0], self.points[:, 1]).max())
+
+        @classmethod
+        def rectangle(cls, length: float, width: float) -> Template:
+            """Create a rectangle shaped template, centered like Interferer.rectangle."""
+            length_half = length / 2
+            width_half = width / 2
+            return cls(
+                [
+                    (length_half, width_half),
+                    (length_half, -width_half),
+                    (-length_half, -width_half),
+                    (-length_half, width_half),
+                ]
+            )
+
+        @classmethod
+        def polygon(cls, diameter: float, number_sides: int) -> Template:
+            """Create a regular polygon shaped template, centered like Interferer.polygon."""
+            angles = np.arange(number_sides) / number_sides * 2 * np.pi
+            radius = diameter / 2
+            return cls(np.column_stack((radius * np.cos(angles), radius * np.sin(angles))))
+
+
+    class InstancedInterferers:
+        """A read only sequence of interferers placed as instances of templates.
+        Every instance is a template index, position, rotation and scale. An interferer with euclid points
+        and segments is only built when an instance is accessed, and kept so that it stays the same object."""
+
+        templates: list[Template]
+        template_indices: np.ndarray
+        positions: np.ndarray
+        rotations: np.ndarray
+        scales: np.ndarray
+        built: dict[int, Interferer]
+        indices: dict[int, int]
+
+        def __init__(
+            self,
+            templates: list[Template],
+            template_indices: Iterable[int],
+            positions: Iterable[tuple[float, float]],
+            rotations: Iterable[float],
+            scales: Iterable[float] | None = None,
+        ) -> None:
+            self.templates = templates
+            self.template_indices = np.asarray(template_indices, dtype=np.int64)
+            self.positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+            self.rotations = np.asarray(rotations, dtype=np.float64)
+            if scales is None:
+                scales = np.ones(len(self.template_indices))
+            self.scales = np.asarray(scales, dtype=np.float64)
+            if not (
+                len(self.template_indices)
+                == len(self.positions)
+                == len(self.rotations)
+                == len(self.scales)
+            ):
+                raise ValueError("Instances need a template index, position, rotation and scale each")
+            if np.any(self.scales <= 0):
+                raise ValueError("Instances need positive scales")
+            self.built = {}
+            self.indices = {}
+
+        def __len__(self) -> int:
+            return len(self.template_indices)
+
+        def __getitem__(self, i: int) -> Interferer:
+            if i < 0:
+                i += len(self)
+            if not 0 <= i < len(self):
+                raise IndexError("Instance index out of range")
+            if i not in self.built:
+                template = self.templates[self.template_indices[i]]
+                points = [Point(x, y) for x, y in self.transform(i, template.points).tolist()]
+                self.built[i] = Interferer(points, template.closed)
+                self.indices[id(self.built[i])] = i
+            return self.built[i]
+
+        def __iter__(self) -> Iterator[Interferer]:
+            for i in range(len(self)):
+                yield self[i]
+
+        def index_of(self, interferer: Interferer) -> int:
+            """Finds the index of an interferer built by this sequence, see System.get_interferer_index."""
+            return self.indices[id(interferer)]
+
+        def transform(self, i: int, points: np.ndarray) -> np.ndarray:
+            """Moves local points of the template of an instance to where the instance is placed."""
+            c = np.cos(self.rotations[i]) * self.scales[i]
+            s = np.sin(self.rotations[i]) * self.scales[i]
+            x = points[:, 0]
+            y = points[:, 1]
+            return np.column_stack(
+                (self.positions[i, 0] + c * x - s * y, self.positions[i, 1] + s * x + c * y)
+            )
+
+        def to_dict(self) -> dict:
+            """Describes the templates and transforms with plain values for storage, see System.to_dict."""
+            return {
+                "templates": [
+                    {"points": template.points.tolist(), "closed": template.closed}
+                    for template in self.templates
+                ],
+                "template_indices": self.template_indices.tolist(),
+                "positions": self.positions.tolist(),
+                "rotations": self.rotations.tolist(),
+                "scales": self.scales.tolist(),
+            }
+
+        @classmethod
+        def from_dict(cls, data: dict) -> InstancedInterferers:
+            """Create instances from a description made by to_dict."""
+            templates = [
+                Template(template["points"], template["closed"]) for template in data["templates"]
+            ]
+            return cls(
+                templates,
+                data["template_indices"],
+                data["positions"],
+                data["rotations"],
+                data["scales"],
+            )
+
+
+    def trace_instanced(
+        system: System,
+        starting_vectors: Iterable[Vector],
+        receiver_diameter: float,
+        max_reflections: int,
+        power_multiplier: float = 0.9,
+    ) -> Iterator[Path | None]:
+        """Traces every starting vector against instanced interferers without building their geometry.
+        Each leg keeps the instances whose bounding circle meets the ray, moves the ray into the template
+        space of every kept instance and intersects it with the template segments there.
+        The ray parameter of an intersection is the same in both spaces, so the closest hit is found directly."""
+        instances = system.interferers
+        if not isinstance(instances, InstancedInterferers):
+            raise ValueError("The instanced backend needs InstancedInterferers as interferers")
+        receiver = system.receiver.position
+        receiver_radius = receiver_diameter / 2
+        radii = instances.scales * np.array(
+            [template.radius for template in instances.templates]
+        )[instances.template_indices]
+        cosines = np.cos(instances.rotations)
+        sines = np.sin(instances.rotations)
+        # instances are grouped by template, so each group intersects one segment array
+        groups = [
+            np.flatnonzero(instances.template_indices == t) for t in range(len(instances.templates))
+        ]
+        for starting_vector in starting_vectors:
+            px = system.transmitter.position.x
+            py = system.transmitter.position.y
+            vx = starting_vector.x
+            vy = starting_vector.y
+            points = [system.transmitter.position.copy()]
+            hits = []
+            segments = []
+            ignore = (-1, -1)
+            path = None
+            for r in range(max_reflections):
+                # bounding circles the ray line passes through and that do not lie behind the ray
+                length = sqrt(vx * vx + vy * vy)
+                cx = instances.positions[:, 0] - px
+                cy = instances.positions[:, 1] - py
+                near = (np.abs(vx * cy - vy * cx) <= radii * length) & (
+                    vx * cx + vy * cy >= -radii * length
+                )
+                closest = None
+                closest_t = 0.0
+                for t, group in enumerate(groups):
+                    group = group[near[group]]
+                    if len(group) == 0:
+                        continue
+                    template = instances.templates[t]
+                    scales = instances.scales[group]
+                    # the ray in the template space of every instance of the group
+                    ox = (cosines[group] * -cx[group] + sines[group] * -cy[group]) / scales
+                    oy = (-sines[group] * -cx[group] + cosines[group] * -cy[group]) / scales
+                    dx = (cosines[group] * vx + sines[group] * vy) / scales
+                    dy = (-sines[group] * vx + cosines[group] * vy) / scales
+                    sx = template.segments[:, 0]
+                    sy = template.segments[:, 1]
+                    svx = template.segments[:, 2]
+                    svy = template.segments[:, 3]
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        d = dy[:, None] * svx - dx[:, None] * svy
+                        offset_x = sx - ox[:, None]
+                        offset_y = sy - oy[:, None]
+                        ua = (dx[:, None] * offset_y - dy[:, None] * offset_x) / d
+                        ub = (svx * offset_y - svy * offset_x) / d
+                    valid = (d != 0) & (ua >= 0) & (ua <= 1) & (ub >= 0)
+                    if ignore[0] in group:
+                        valid[np.flatnonzero(group == ignore[0])[0], ignore[1]] = False
+                    if not valid.any():
+                        continue
+                    ub = np.where(valid, ub, np.inf)
+                    g, s = np.unravel_index(np.argmin(ub), ub.shape)
+                    if closest is None or ub[g, s] < closest_t:
+                        closest = (int(group[g]), int(s), float(ua[g, s]))
+                        closest_t = float(ub[g, s])
+                if closest is None:
+                    break
+                i, s, u = closest
+                interferer = instances[i]
+                segment = interferer.segments[s]
+                point = Point(segment.p.x + u * segment.v.x, segment.p.y + u * segment.v.y)
+                points.append(point)
+                hits.append(interferer)
+                segments.append(segment)
+
+                # determine ray propagation to target
+                receiver_x = receiver.x - px
+                receiver_y = receiver.y - py
+                if receiver_x**2 + receiver_y**2 < (point.x - px) ** 2 + (point.y - py) ** 2:
+                    along = max((receiver_x * vx + receiver_y * vy) / (length * length), 0)
+                    distance = sqrt(
+                        (receiver_x - along * vx) ** 2 + (receiver_y - along * vy) ** 2
+                    )
+                    if distance < receiver_radius:
+                        points.append(receiver.copy())
+                        path = Path(points, hits, power_multiplier, segments)
+                        break
+
+                # calculate reflected ray
+                normal = Vector(-segment.v.y, segment.v.x).normalized()
+                dot = 2 * (vx * normal.x + vy * normal.y)
+                vx = vx - dot * normal.x
+                vy = vy - dot * normal.y
+                px = point.x
+                py = point.y
+                ignore = (i, s)
+            yield path
+
+
+    System.register_backend("instanced", trace_instanced)
+
+
+    if __name__ == "__main__":
+        from time import sleep
+        print("This file is just a library, does not work on its own.")
+        sleep(5)
+except KeyboardInterrupt:
+    exit()
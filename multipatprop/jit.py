@@ -0,0 +1,183 @@
+"""A tracing backend that compiles the reflection loop with numba, selected with backend="numba"."""
+try:
+    from math import sqrt
+    from typing import Iterable, Iterator
+    from itertools import islice
+    from ctypes import CDLL, c_double
+    from ctypes.util import find_library
+    import numpy as np
+    from numba import njit
+    from multipatprop import System, Path, Point, Vector
+
+    # number of rays traced by one call of the compiled kernel
+    CHUNK_SIZE = 4096
+
+    # python computes x ** 2 with libm pow, which is not always exactly x * x,
+    # so the kernel calls the same pow to give identical results to the euclid backend
+    libm_name = find_library("m") or find_library("c")
+    if libm_name is not None:
+        libm_pow = CDLL(libm_name).pow
+        libm_pow.restype = c_double
+        libm_pow.argtypes = [c_double, c_double]
+
+        @njit
+        def square(x: float) -> float:
+            return libm_pow(x, 2.0)
+
+    else:
+
+        @njit
+        def square(x: float) -> float:
+            return x * x
+
+
+    @njit
+    def trace_kernel(
+        segments: np.ndarray,
+        transmitter: np.ndarray,
+        receiver: np.ndarray,
+        vectors: np.ndarray,
+        receiver_radius: float,
+        max_reflections: int,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Traces every starting vector over flat segment arrays with the same arithmetic as the euclid backend.
+        Returns the number of hits of each propagated ray (-1 if not propagated), the points of reflection and the hit segments."""
+        number = vectors.shape[0]
+        lengths = np.full(number, -1, dtype=np.int64)
+        points = np.zeros((number, max_reflections, 2))
+        hits = np.zeros((number, max_reflections), dtype=np.int64)
+        for n in range(number):
+            px = transmitter[0]
+            py = transmitter[1]
+            vx = vectors[n, 0]
+            vy = vectors[n, 1]
+            segment_ignore = -1
+            for r in range(max_reflections):
+                closest = -1
+                closest_x = 0.0
+                closest_y = 0.0
+                closest_distance = 0.0
+                for s in range(segments.shape[0]):
+                    if s == segment_ignore:
+                        continue
+                    sx = segments[s, 0]
+                    sy = segments[s, 1]
+                    svx = segments[s, 2]
+                    svy = segments[s, 3]
+                    # euclid intersects the segment with the ray, so the segment comes first
+                    d = vy * svx - vx * svy
+                    if d == 0:
+                        continue
+                    dy = sy - py
+                    dx = sx - px
+                    ua = (vx * dy - vy * dx) / d
+                    if not (ua >= 0.0 and ua <= 1.0):
+                        continue
+                    ub = (svx * dy - svy * dx) / d
+                    if not ub >= 0.0:
+                        continue
+                    x = sx + ua * svx
+                    y = sy + ua * svy
+                    distance = sqrt(square(x - px) + square(y - py))
+                    # closest intersection is the point of reflection
+                    if closest == -1 or distance < closest_distance:
+                        closest = s
+                        closest_x = x
+                        closest_y = y
+                        closest_distance = distance
+
+                if closest == -1:
+                    break
+                points[n, r, 0] = closest_x
+                points[n, r, 1] = closest_y
+                hits[n, r] = closest
+
+                # determine ray propagation to target
+                receiver_distance = sqrt(
+                    square(receiver[0] - px) + square(receiver[1] - py)
+                )
+                if receiver_distance < closest_distance:
+                    u = ((receiver[0] - px) * vx + (receiver[1] - py) * vy) / (
+                        square(vx) + square(vy)
+                    )
+                    if not u >= 0.0:
+                        u = 0.0
+                    ray_distance = sqrt(
+                        square(px + u * vx - receiver[0]) + square(py + u * vy - receiver[1])
+                    )
+                    if ray_distance < receiver_radius:
+                        lengths[n] = r + 1
+                        break
+
+                # calculate reflected ray
+                nx = -segments[closest, 3]
+                ny = segments[closest, 2]
+                magnitude = sqrt(square(nx) + square(ny))
+                if magnitude:
+                    nx = nx / magnitude
+                    ny = ny / magnitude
+                dot = 2 * (vx * nx + vy * ny)
+                vx = vx - dot * nx
+                vy = vy - dot * ny
+                px = closest_x
+                py = closest_y
+                segment_ignore = closest
+        return lengths, points, hits
+
+
+    def trace_numba(
+        system: System,
+        starting_vectors: Iterable[Vector],
+        receiver_diameter: float,
+        max_reflections: int,
+        power_multiplier: float = 0.9,
+    ) -> Iterator[Path | None]:
+        """Traces the starting vectors in chunks with the compiled kernel and rebuilds the paths from its arrays."""
+        segments = []
+        owners = []
+        for interferer in system.interferers:
+            for segment in interferer.segments:
+                segments.append(segment)
+                owners.append(interferer)
+        segment_array = np.array(
+            [(segment.p.x, segment.p.y, segment.v.x, segment.v.y) for segment in segments],
+            dtype=np.float64,
+        ).reshape(-1, 4)
+        transmitter = system.transmitter.position
+        receiver = system.receiver.position
+        transmitter_array = np.array((transmitter.x, transmitter.y), dtype=np.float64)
+        receiver_array = np.array((receiver.x, receiver.y), dtype=np.float64)
+        starting_vectors = iter(starting_vectors)
+        while chunk := list(islice(starting_vectors, CHUNK_SIZE)):
+            vectors = np.array([(vector.x, vector.y) for vector in chunk], dtype=np.float64)
+            lengths, points, hits = trace_kernel(
+                segment_array,
+                transmitter_array,
+                receiver_array,
+                vectors.reshape(-1, 2),
+                receiver_diameter / 2,
+                max_reflections,
+            )
+            for n in range(len(chunk)):
+                length = int(lengths[n])
+                if length == -1:
+                    yield None
+                    continue
+                path_points = [transmitter.copy()]
+                for x, y in points[n, :length].tolist():
+                    path_points.append(Point(x, y))
+                path_points.append(receiver.copy())
+                path_segments = [segments[s] for s in hits[n, :length].tolist()]
+                path_hits = [owners[s] for s in hits[n, :length].tolist()]
+                yield Path(path_points, path_hits, power_multiplier, path_segments)
+
+
+    System.register_backend("numba", trace_numba)
+
+
+    if __name__ == "__main__":
+        from time import sleep
+        print("This file is just a library, does not work on its own.")
+        sleep(5)
+except KeyboardInterrupt:
+    exit()
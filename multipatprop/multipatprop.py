@@ -2,10 +2,13 @@
 from __future__ import annotations
 
 try:
-    from math import pi, tau, cos, sin, atan2, hypot
+    import json
+    from importlib import import_module
+    from math import pi, tau, cos, sin, atan2, hypot, sqrt
     from random import random
-    from itertools import pairwise
-    from typing import Iterable, Iterator
+    from itertools import pairwise, islice, tee
+    from time import perf_counter
+    from typing import Callable, Iterable, Iterator
     from euclid import (
         Point2 as Point,
         Vector2 as Vector,
@@ -16,19 +19,120 @@ try:
     class System:
         """A multipath propagation system where a transmitter and receiver exist as well as interferers."""
 
+        backends: dict[str, Callable[..., Iterator[Path | None]]] = {}
+        # modules of optional backends, imported when their backend is first used
+        optional_backends: dict[str, str] = {"numba": "jit", "instanced": "instances"}
+        # optional backends that failed to import, warned about once
+        unavailable_backends: set[str] = set()
         transmitter: Transmitter
         receiver: Receiver
         interferers: list[Interferer]
+        backend: str
 
         def __init__(
             self,
             transmitter: Transmitter,
             receiver: Receiver,
             interferers: list[Interferer],
+            backend: str = "python",
         ) -> None:
             self.transmitter = transmitter
             self.receiver = receiver
             self.interferers = interferers
+            self.backend = backend
+
+        def to_dict(self) -> dict:
+            """Describes the transmitter, receiver and interferers of the system with plain values for storage."""
+            data = {
+                "transmitter": [self.transmitter.position.x, self.transmitter.position.y],
+                "receiver": [self.receiver.position.x, self.receiver.position.y],
+            }
+            # instanced interferers are stored as their templates and transforms
+            if hasattr(self.interferers, "to_dict"):
+                data["instances"] = self.interferers.to_dict()
+                return data
+            data["interferers"] = [
+                {
+                    "points": [[point.x, point.y] for point in interferer.points],
+                    "closed": interferer.closed,
+                }
+                for interferer in self.interferers
+            ]
+            return data
+
+        @classmethod
+        def from_dict(cls, data: dict, backend: str = "python") -> System:
+            """Create a system from a description made by to_dict."""
+            transmitter = Transmitter(Point(*data["transmitter"]))
+            receiver = Receiver(Point(*data["receiver"]))
+            if "instances" in data:
+                from instances import InstancedInterferers
+
+                interferers = InstancedInterferers.from_dict(data["instances"])
+            else:
+                interferers = [
+                    Interferer([Point(x, y) for x, y in interferer["points"]], interferer["closed"])
+                    for interferer in data["interferers"]
+                ]
+            return cls(transmitter, receiver, interferers, backend)
+
+        def save(self, filename: str) -> None:
+            """Write the system to a json scene file."""
+            with open(filename, "w") as file:
+                json.dump(self.to_dict(), file)
+
+        @classmethod
+        def load(cls, filename: str, backend: str = "python") -> System:
+            """Read a system from a json scene file."""
+            with open(filename) as file:
+                return cls.from_dict(json.load(file), backend)
+
+        @classmethod
+        def register_backend(
+            cls, name: str, trace: Callable[..., Iterator[Path | None]]
+        ) -> None:
+            """Make a tracing backend selectable by name, the backend yields one path or None per starting vector."""
+            cls.backends[name] = trace
+
+        def get_backend(self) -> Callable[..., Iterator[Path | None]]:
+            """Finds the tracing backend of the system, falls back to the python backend if an optional backend is unavailable.
+            An unavailable backend is only tried and warned about once."""
+            if self.backend in System.backends:
+                return System.backends[self.backend]
+            if self.backend not in System.optional_backends:
+                raise ValueError(f"Unknown backend {self.backend}")
+            if self.backend not in System.unavailable_backends:
+                # optional backends register themselves when their module is imported
+                try:
+                    import_module(System.optional_backends[self.backend])
+                except ImportError:
+                    pass
+                if self.backend in System.backends:
+                    return System.backends[self.backend]
+                print(f"Backend {self.backend} is unavailable, using python backend instead.")
+                System.unavailable_backends.add(self.backend)
+            return System.backends["python"]
+
+        def get_interferer_index(self) -> Callable[[Interferer], int]:
+            """Finds a lookup from interferers of the system to their index, without building instanced interferers."""
+            if hasattr(self.interferers, "index_of"):
+                return self.interferers.index_of
+            indices = {id(interferer): i for i, interferer in enumerate(self.interferers)}
+            return lambda interferer: indices[id(interferer)]
+
+        def get_segment_index(self) -> Callable[[Interferer, Segment], tuple[int, int]]:
+            """Finds a lookup from a hit interferer and segment to the index of the interferer and of the segment in it.
+            Segment indices are found the first time a segment of an interferer is looked up."""
+            interferer_index = self.get_interferer_index()
+            segment_indices = {}
+
+            def segment_index(interferer: Interferer, segment: Segment) -> tuple[int, int]:
+                if id(segment) not in segment_indices:
+                    for s, interferer_segment in enumerate(interferer.segments):
+                        segment_indices[id(interferer_segment)] = s
+                return interferer_index(interferer), segment_indices[id(segment)]
+
+            return segment_index
 
         def get_multipath(
             self,
@@ -36,27 +140,267 @@ try:
             receiver_diameter: float,
             max_reflections: int,
             power_multiplier: float = 0.9,
+            time_budget: float | None = None,
         ) -> Multipath:
             """Finds the path of a number of propagated transmissions distributed evenly in every direction.
-            Each path returns with a vector indicating the last direction."""
+            Each path returns with a vector indicating the last direction.
+            With a time budget in seconds, starting angles are traced from coarse to fine in bit reversed order,
+            in batches sized to finish before the deadline, and tracing stops at the deadline,
+            so the paths found cover every direction evenly.
+            The resolution of the multipath is then the largest angle between traced starting angles."""
+            if time_budget is None:
+                batches = iter([range(starting_number)])
+            else:
+                deadline = perf_counter() + time_budget
+                batches = self.get_batches(bit_reversed(starting_number), deadline)
             print("Calculating propagated paths...", end="\r")
             paths = []
+            traced_indices = []
+            for batch in batches:
+                starting_angles = (tau * (n / starting_number) for n in batch)
+                traced = self.get_paths(
+                    starting_angles, receiver_diameter, max_reflections, power_multiplier
+                )
+                for n, (starting_angle, path) in zip(batch, traced):
+                    traced_indices.append(n)
+                    # figure out if path propagated
+                    if path is not None:
+                        paths.append((n, path))
+                        print(
+                            f"Calculating propagated paths... (number: {len(paths)}, angle: {round(starting_angle * 180 / pi)})",
+                            end="\r",
+                        )
+            print()
+            if time_budget is None:
+                multipath = Multipath([path for n, path in paths], starting_number)
+                return multipath
+            if not traced_indices:
+                return Multipath([], 0)
+            paths.sort(key=lambda path: path[0])
+            traced_indices.sort()
+            gaps = [n_2 - n_1 for n_1, n_2 in pairwise(traced_indices)]
+            gaps.append(traced_indices[0] + starting_number - traced_indices[-1])
+            resolution = tau * (max(gaps) / starting_number)
+            multipath = Multipath([path for n, path in paths], len(traced_indices), resolution)
+            print(
+                f"Traced {len(traced_indices)} of {starting_number} starting paths (resolution: {resolution * 180 / pi:.3f} degrees)"
+            )
+            return multipath
+
+        @staticmethod
+        def get_batches(indices: Iterator[int], deadline: float) -> Iterator[list[int]]:
+            """Splits indices into batches until the deadline, every batch is traced whole by the caller.
+            Batches grow with the measured tracing rate while taking at most half of the time left,
+            so backends tracing in chunks finish each batch inside the budget and no traced path is lost."""
+            batch_size = 1
+            while batch := list(islice(indices, batch_size)):
+                start = perf_counter()
+                yield batch
+                now = perf_counter()
+                if now > deadline:
+                    return
+                rate = len(batch) / max(now - start, 1e-9)
+                batch_size = max(1, min(2 * batch_size, int((deadline - now) * rate / 2)))
+
+        def get_multipath_converged(
+            self,
+            receiver_diameter: float,
+            max_reflections: int,
+            power_multiplier: float = 0.9,
+            tolerance: float = 0.05,
+            batch_number: int = 256,
+            max_number: int = 100000,
+            delay_resolution: float = 1e-9,
+            sequence: str = "halton",
+        ) -> tuple[Multipath, float]:
+            """Finds propagated paths in batches of low discrepancy starting angles until the standard errors
+            of the received power and of the delay histogram per starting path, relative to the power, are below the tolerance,
+            returns with the multipath and the error estimate. The standard errors are found from the spread of
+            the estimates of every batch, at least four batches are traced.
+            The sequence is either "halton" (base 2 radical inverse) or "jittered" (stratified angles per batch)."""
+            paths = []
+            number = 0
+            batches = 0
+            # sums and sums of squares over batches of the power and the histogram per starting path
+            power_sum = 0
+            power_square = 0
+            histogram_sum = {}
+            histogram_square = {}
+            error = 1
+            print("Calculating propagated paths...", end="\r")
+            while number < max_number:
+                batch = min(batch_number, max_number - number)
+                if sequence == "halton":
+                    starting_angles = [
+                        tau * radical_inverse(n) for n in range(number, number + batch)
+                    ]
+                elif sequence == "jittered":
+                    starting_angles = [tau * ((n + random()) / batch) for n in range(batch)]
+                else:
+                    raise ValueError(f"Unknown sequence {sequence}")
+                traced = self.get_paths(
+                    starting_angles, receiver_diameter, max_reflections, power_multiplier
+                )
+                power = 0
+                histogram = {}
+                for starting_angle, path in traced:
+                    if path is not None:
+                        paths.append(path)
+                        power += path.power
+                        b = int(path.delay / delay_resolution)
+                        histogram[b] = histogram.get(b, 0) + path.power
+                number += batch
+                batches += 1
+                power_sum += power / batch
+                power_square += (power / batch) ** 2
+                for b, bin_power in histogram.items():
+                    histogram_sum[b] = histogram_sum.get(b, 0) + bin_power / batch
+                    histogram_square[b] = histogram_square.get(b, 0) + (bin_power / batch) ** 2
+
+                # standard error of the mean of the batch estimates, relative to the estimate
+                power_mean = power_sum / batches
+                if batches >= 2 and power_mean > 0:
+                    power_variance = max(power_square - power_sum**2 / batches, 0) / (batches - 1)
+                    power_error = sqrt(power_variance / batches) / power_mean
+                    # standard errors of the bins combined, relative to the power like the power error
+                    histogram_variance = 0
+                    for b, bin_sum in histogram_sum.items():
+                        histogram_variance += max(
+                            histogram_square[b] - bin_sum**2 / batches, 0
+                        ) / (batches - 1)
+                    histogram_error = sqrt(histogram_variance / batches) / power_mean
+                    error = max(power_error, histogram_error)
+                print(
+                    f"Calculating propagated paths... (number: {len(paths)}, starting: {number}, error: {error:.2E})",
+                    end="\r",
+                )
+                if batches >= 4 and error < tolerance:
+                    break
+            multipath = Multipath(paths, number)
+            print()
+            print(f"Stopped after {number} starting paths (error: {error:.2E})")
+            return multipath, error
+
+        def get_statistics(
+            self,
+            starting_number: int,
+            receiver_diameter: float,
+            max_reflections: int,
+            power_multiplier: float = 0.9,
+            bins: int = 100,
+            max_delay: float = 1e-6,
+        ) -> Statistics:
+            """Finds the statistics of propagated transmissions distributed evenly in every direction
+            without keeping any path, so memory stays constant for any number of starting paths."""
+            statistics = Statistics(
+                bins, max_delay, max_reflections, len(self.interferers), power_multiplier
+            )
+            interferer_index = self.get_interferer_index()
+            starting_angles = (tau * (n / starting_number) for n in range(starting_number))
+            traced = self.get_paths(
+                starting_angles, receiver_diameter, max_reflections, power_multiplier
+            )
+            print("Calculating propagated paths...", end="\r")
+            for n, (starting_angle, path) in enumerate(traced):
+                if path is not None:
+                    statistics.add(path, [interferer_index(hit) for hit in path.hits])
+                if n % 10000 == 0:
+                    print(
+                        f"Calculating propagated paths... (number: {statistics.number}, angle: {round(starting_angle * 180 / pi)})",
+                        end="\r",
+                    )
+            statistics.starting_number = starting_number
+            print()
+            return statistics
+
+        def get_sweep(
+            self,
+            starting_number: int,
+            receiver_diameters: list[float],
+            max_reflections: list[int],
+            power_multipliers: list[float],
+        ) -> dict[tuple[float, int, float], Multipath]:
+            """Finds the multipath of every combination of receiver diameter, max reflections and power multiplier,
+            the result of each is keyed by its settings. The python backend traces once at the largest max reflections
+            and derives every receiver diameter from the legs, other backends trace once per receiver diameter."""
+            multipaths = {
+                (receiver_diameter, max_reflection, power_multiplier): Multipath([], starting_number)
+                for receiver_diameter in receiver_diameters
+                for max_reflection in max_reflections
+                for power_multiplier in power_multipliers
+            }
+
+            def add(receiver_diameter: float, path: Path) -> None:
+                # a path found at the largest max reflections belongs to every max reflections it fits in
+                for power_multiplier in power_multipliers:
+                    path = Path(path.points, path.hits, power_multiplier, path.segments)
+                    for max_reflection in max_reflections:
+                        if len(path.hits) <= max_reflection:
+                            multipaths[
+                                receiver_diameter, max_reflection, power_multiplier
+                            ].paths.append(path)
+
+            print("Calculating propagated paths...", end="\r")
+            if self.get_backend() is not trace_python:
+                for receiver_diameter in receiver_diameters:
+                    starting_angles = (tau * (n / starting_number) for n in range(starting_number))
+                    traced = self.get_paths(
+                        starting_angles, receiver_diameter, max(max_reflections)
+                    )
+                    for n, (starting_angle, path) in enumerate(traced):
+                        if path is not None:
+                            add(receiver_diameter, path)
+                        if n % 10000 == 0:
+                            print(
+                                f"Calculating propagated paths... (receiver diameter: {receiver_diameter}, angle: {round(starting_angle * 180 / pi)})",
+                                end="\r",
+                            )
+                print()
+                return multipaths
             for n in range(starting_number):
                 starting_angle = tau * (n / starting_number)
                 starting_vector = Vector(cos(starting_angle), sin(starting_angle))
-                path = self.get_path(
-                    starting_vector, receiver_diameter, max_reflections, power_multiplier
-                )
-                # figure out if path propagated
-                if path is not None:
-                    paths.append(path)
+                legs = list(self.get_legs(starting_vector, max(max_reflections)))
+                for receiver_diameter in receiver_diameters:
+                    # the first leg passing the receiver ends the path for this diameter
+                    for r, (point, segment, interferer, receiver_distance) in enumerate(legs):
+                        if receiver_distance < receiver_diameter / 2:
+                            break
+                    else:
+                        continue
+                    points = [self.transmitter.position.copy()]
+                    points += [leg[0] for leg in legs[: r + 1]]
+                    points.append(self.receiver.position.copy())
+                    segments = [leg[1] for leg in legs[: r + 1]]
+                    hits = [leg[2] for leg in legs[: r + 1]]
+                    add(receiver_diameter, Path(points, hits, 1, segments))
+                if n % 10000 == 0:
                     print(
-                        f"Calculating propagated paths... (number: {len(paths)}, angle: {round(starting_angle * 180 / pi)})",
+                        f"Calculating propagated paths... (angle: {round(starting_angle * 180 / pi)})",
                         end="\r",
                     )
-            multipath = Multipath(paths, starting_number)
             print()
-            return multipath
+            return multipaths
+
+        def get_paths(
+            self,
+            starting_angles: Iterable[float],
+            receiver_diameter: float,
+            max_reflections: int,
+            power_multiplier: float = 0.9,
+        ) -> Iterator[tuple[float, Path | None]]:
+            """Traces one transmission for every starting angle with the backend of the system.
+            The starting angles are consumed lazily so they may be a generator of any length."""
+            trace = self.get_backend()
+            starting_angles, vector_angles = tee(starting_angles)
+            starting_vectors = (
+                Vector(cos(starting_angle), sin(starting_angle))
+                for starting_angle in vector_angles
+            )
+            traced = trace(
+                self, starting_vectors, receiver_diameter, max_reflections, power_multiplier
+            )
+            return zip(starting_angles, traced)
 
         def get_path(
             self,
@@ -68,7 +412,25 @@ try:
             """Finds the path of one transmission, returns with vector only if max_reflections is not reached."""
             points = [self.transmitter.position.copy()]
             hits = []
-            ray = Ray(points[0], starting_vector)
+            segments = []
+            legs = self.get_legs(starting_vector, max_reflections)
+            for point, segment, interferer, receiver_distance in legs:
+                points.append(point)
+                hits.append(interferer)
+                segments.append(segment)
+                if receiver_distance < receiver_diameter / 2:
+                    points.append(self.receiver.position.copy())
+                    path = Path(points, hits, power_multiplier, segments)
+                    return path
+            return None
+
+        def get_legs(
+            self, starting_vector: Vector, max_reflections: int
+        ) -> Iterator[tuple[Point, Segment, Interferer, float]]:
+            """Follows one transmission through up to max_reflections reflections regardless of the receiver.
+            Yields the point of reflection, hit segment and interferer of every leg, with the distance between
+            the leg and the receiver (infinite if the receiver is not passed before the reflection)."""
+            ray = Ray(self.transmitter.position.copy(), starting_vector)
             vector = starting_vector
             segment_ignore = None
             for r in range(max_reflections):
@@ -91,23 +453,56 @@ try:
                                 closest_interferer = interferer
 
                 if not closest:
-                    return None
-                points.append(closest_point)
-                hits.append(closest_interferer)
+                    return
                 # calculate reflected ray
                 normal = Vector(-closest_segment.v.y, closest_segment.v.x).normalized()
                 vector = vector.reflect(normal)
 
                 # determine ray propagation to target
+                receiver_distance = float("inf")
                 if ray.p1.distance(self.receiver.position) < ray.p1.distance(closest_point):
-                    if ray.distance(self.receiver.position) < receiver_diameter / 2:
-                        points.append(self.receiver.position.copy())
-                        path = Path(points, hits, power_multiplier)
-                        return path
+                    receiver_distance = ray.distance(self.receiver.position)
+                yield closest_point, closest_segment, closest_interferer, receiver_distance
 
                 ray = Ray(closest_point, vector)
                 segment_ignore = closest_segment
-            return None
+
+
+    def trace_python(
+        system: System,
+        starting_vectors: Iterable[Vector],
+        receiver_diameter: float,
+        max_reflections: int,
+        power_multiplier: float = 0.9,
+    ) -> Iterator[Path | None]:
+        """Traces every starting vector with the pure python euclid implementation."""
+        for starting_vector in starting_vectors:
+            yield system.get_path(
+                starting_vector, receiver_diameter, max_reflections, power_multiplier
+            )
+
+
+    System.register_backend("python", trace_python)
+
+
+    def bit_reversed(number: int) -> Iterator[int]:
+        """Yields every index below number in bit reversed order, from coarse to fine."""
+        bits = max(number - 1, 0).bit_length()
+        for k in range(1 << bits):
+            n = int(f"{k:0{bits}b}"[::-1], 2) if bits > 0 else 0
+            if n < number:
+                yield n
+
+
+    def radical_inverse(n: int, base: int = 2) -> float:
+        """Mirrors the digits of n about the radix point, the n-th number of the van der Corput sequence."""
+        inverse = 0
+        fraction = 1 / base
+        while n > 0:
+            inverse += (n % base) * fraction
+            n //= base
+            fraction /= base
+        return inverse
 
 
     class Transmitter:
@@ -133,10 +528,12 @@ try:
 
         points: list[Point]
         segments: list[Segment]
+        closed: bool
         hits: int
 
         def __init__(self, points: list[Point], closed=True) -> None:
             self.points = points
+            self.closed = closed
             self.segments = []
             if closed:
                 all_points = points + [points[0]]
@@ -248,10 +645,17 @@ try:
 
         paths: list[Path]
         starting_number: int
+        resolution: float
 
-        def __init__(self, paths: list[Path], starting_number: int) -> None:
+        def __init__(
+            self, paths: list[Path], starting_number: int, resolution: float | None = None
+        ) -> None:
             self.paths = paths
             self.starting_number = starting_number
+            # largest angle between starting angles, evenly distributed unless given
+            if resolution is None:
+                resolution = tau / max(starting_number, 1)
+            self.resolution = resolution
 
         def __iter__(self) -> Iterator[Path]:
             for path in self.paths:
@@ -261,6 +665,146 @@ try:
             for path in self.paths:
                 yield path.signal(signal)
 
+        def aggregate(self) -> Multipath:
+            """Groups the paths by their reflection sequence and collapses every group into one representative path.
+            The representative is the path closest to the mean delay, weighted by the group size with the delay spread of the group."""
+            groups = {}
+            for path in self.paths:
+                groups.setdefault(path.sequence(), []).append(path)
+            paths = []
+            for group in groups.values():
+                weight = sum(path.weight for path in group)
+                delay = sum(path.delay * path.weight for path in group) / weight
+                # spread combines the spreads within and between the grouped paths
+                variance = (
+                    sum(
+                        (path.delay_spread**2 + (path.delay - delay) ** 2) * path.weight
+                        for path in group
+                    )
+                    / weight
+                )
+                representative = min(group, key=lambda path: abs(path.delay - delay))
+                aggregated = Path(representative.points, representative.hits, 1, representative.segments)
+                aggregated.power = representative.power
+                aggregated.delay = delay
+                aggregated.weight = weight
+                aggregated.delay_spread = variance**0.5
+                aggregated.past_receiver = representative.past_receiver
+                paths.append(aggregated)
+            paths.sort(key=lambda path: path.delay)
+            multipath = Multipath(paths, self.starting_number)
+            return multipath
+
+
+    class Statistics:
+        """Running totals of propagated paths with fixed size histograms, kept instead of the paths themselves.
+        Powers are derived from integer counts per reflection order, so merged statistics equal those of one run exactly."""
+
+        starting_number: int
+        number: int
+        power_multiplier: float
+        delay_minimum: float
+        delay_maximum: float
+        max_delay: float
+        bin_orders: list[list[int]]
+        orders: list[int]
+        hits: list[int]
+
+        def __init__(
+            self,
+            bins: int,
+            max_delay: float,
+            max_reflections: int,
+            interferer_number: int,
+            power_multiplier: float = 0.9,
+        ) -> None:
+            self.starting_number = 0
+            self.number = 0
+            self.power_multiplier = power_multiplier
+            self.delay_minimum = float("inf")
+            self.delay_maximum = 0
+            self.max_delay = max_delay
+            self.bin_orders = [[0] * (max_reflections + 1) for b in range(bins)]
+            self.orders = [0] * (max_reflections + 1)
+            self.hits = [0] * interferer_number
+
+        def add(self, path: Path, hits: list[int]) -> None:
+            """Accumulates a propagated path with the indices of its hit interferers, delays past max_delay go in the last bin."""
+            self.number += path.weight
+            self.delay_minimum = min(self.delay_minimum, path.delay)
+            self.delay_maximum = max(self.delay_maximum, path.delay)
+            bins = len(self.bin_orders)
+            b = min(int(path.delay / self.max_delay * bins), bins - 1)
+            self.bin_orders[b][len(hits)] += path.weight
+            self.orders[len(hits)] += path.weight
+            for hit in hits:
+                self.hits[hit] += path.weight
+
+        def merge(self, other: Statistics) -> None:
+            """Adds the totals of statistics with the same bins, as if their paths were accumulated here."""
+            if (
+                self.max_delay != other.max_delay
+                or self.power_multiplier != other.power_multiplier
+                or len(self.bin_orders) != len(other.bin_orders)
+                or len(self.orders) != len(other.orders)
+                or len(self.hits) != len(other.hits)
+            ):
+                raise ValueError("Statistics with different bins can not be merged")
+            self.starting_number += other.starting_number
+            self.number += other.number
+            self.delay_minimum = min(self.delay_minimum, other.delay_minimum)
+            self.delay_maximum = max(self.delay_maximum, other.delay_maximum)
+            for b in range(len(self.bin_orders)):
+                for order in range(len(self.orders)):
+                    self.bin_orders[b][order] += other.bin_orders[b][order]
+            for order in range(len(self.orders)):
+                self.orders[order] += other.orders[order]
+            for i in range(len(self.hits)):
+                self.hits[i] += other.hits[i]
+
+        def order_powers(self) -> list[float]:
+            """Finds the power of a path for every reflection order, the same way as the path does."""
+            powers = []
+            power = 1
+            for order in range(len(self.orders)):
+                powers.append(power)
+                power *= self.power_multiplier
+            return powers
+
+        def power(self) -> float:
+            """Finds the total power of the propagated paths."""
+            return sum(
+                number * power for number, power in zip(self.orders, self.order_powers())
+            )
+
+        def bin_powers(self) -> list[float]:
+            """Finds the total power of the propagated paths in every delay bin."""
+            powers = self.order_powers()
+            return [
+                sum(number * power for number, power in zip(numbers, powers))
+                for numbers in self.bin_orders
+            ]
+
+        def bin_numbers(self) -> list[int]:
+            """Finds the number of propagated paths in every delay bin."""
+            return [sum(numbers) for numbers in self.bin_orders]
+
+        def to_dict(self) -> dict:
+            """Describes the statistics with plain values for storage."""
+            return dict(vars(self))
+
+        @classmethod
+        def from_dict(cls, data: dict) -> Statistics:
+            """Create statistics from a description made by to_dict."""
+            statistics = cls(0, data["max_delay"], 0, 0)
+            vars(statistics).update(data)
+            return statistics
+
+        def bin_edges(self) -> list[float]:
+            """Finds the delays bounding every bin of the histograms."""
+            bins = len(self.bin_orders)
+            return [self.max_delay * (b / bins) for b in range(bins + 1)]
+
 
     class Path:
         """Propagated path containing points of travel, final power and delay."""
@@ -269,9 +813,17 @@ try:
         power: float
         delay: float
         hits: list[Interferer]
+        segments: list[Segment] | None
+        weight: int
+        delay_spread: float
+        past_receiver: bool
 
         def __init__(
-            self, points: list[Point], hits: list[Interferer], power_multiplier: float = 0.9
+            self,
+            points: list[Point],
+            hits: list[Interferer],
+            power_multiplier: float = 0.9,
+            segments: list[Segment] | None = None,
         ) -> None:
             self.points = points
             self.delay = 0
@@ -281,6 +833,26 @@ try:
             for p in range(len(points) - 2):
                 self.power *= power_multiplier
             self.hits = hits
+            self.segments = segments
+            # number of traced paths this path stands for after aggregation
+            self.weight = 1
+            self.delay_spread = 0
+            # ray tracing records the hit after passing the receiver as the last reflection
+            self.past_receiver = True
+
+        def sequence(self) -> tuple[int, ...]:
+            """Finds the reflection sequence of the path, the hit segments or the hit interferers if segments are unknown."""
+            if self.segments is not None:
+                return tuple(id(segment) for segment in self.segments)
+            return tuple(id(hit) for hit in self.hits)
+
+        def arrival_angle(self) -> float:
+            """Finds the direction of travel at the receiver, from the leg passing the receiver."""
+            if self.past_receiver:
+                point_1, point_2 = self.points[-3], self.points[-2]
+            else:
+                point_1, point_2 = self.points[-2], self.points[-1]
+            return atan2(point_2.y - point_1.y, point_2.x - point_1.x)
 
         def __iter__(self) -> Iterator[Point]:
             for point in self.points:
@@ -291,7 +863,7 @@ try:
             strengths = []
             for time, strength in signal:
                 times.append(time + self.delay)
-                strengths.append(strength * self.power)
+                strengths.append(strength * self.power * self.weight)
             signal = DigitalSignal(times, strengths)
             return signal
 
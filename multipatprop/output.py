@@ -1,44 +1,67 @@
+"""Rendering of systems and their propagated paths, the rendering libraries are imported only when used."""
+from __future__ import annotations
+
 try:
     from math import tau
     from itertools import pairwise
+    from heapq import nlargest
     from time import sleep
-    import cairo
-    import matplotlib.pyplot as plt
-    import numpy as np
-    from skimage.draw import line
-    from rich.console import Console
-    from rich.table import Table
-    from multipatprop import System, Multipath, Point
+    from typing import TYPE_CHECKING
+    from multipatprop import System, Multipath, Statistics, Path, Point
 
+    if TYPE_CHECKING:
+        import cairo
 
-    def render(
+
+    def count_hits(system: System, multipath: Multipath) -> None:
+        """Counts the hits of every interferer by the paths, used to color the interferers."""
+        interferers = system.interferers
+        # instanced interferers that were never built were never hit
+        if hasattr(interferers, "built"):
+            interferers = interferers.built.values()
+        for interferer in interferers:
+            interferer.hits = 0
+        for path in multipath:
+            for hit in path.hits:
+                hit.hits += path.weight
+
+
+    def select_paths(multipath: Multipath, max_paths: int | None) -> list[Path]:
+        """Finds the paths that contribute the most power, at most max_paths of them or all if max_paths is None."""
+        if max_paths is None:
+            return list(multipath)
+        return nlargest(max_paths, multipath, key=lambda path: path.power * path.weight)
+
+
+    def draw(
         system: System,
         multipath: Multipath,
         camera_position: Point,
         camera_zoom: float,
         ui_size: float,
-        bins: int,
         red_factor: float,
-    ) -> None:
-        for interferer in system.interferers:
-            interferer.hits = 0
-        for path in multipath:
-            for hit in path.hits:
-                hit.hits += 1
+        size: int = 1000,
+        levels: int | None = None,
+    ) -> cairo.ImageSurface:
+        """Draws the paths, interferers, transmitter and receiver on a square cairo image surface.
+        With a number of levels, paths are bucketed by power and every bucket is stroked at once.
+        Interferers are colored by their hits, see count_hits."""
+        import cairo
 
         # create the rendered visualization of paths, and system
-        with cairo.ImageSurface(cairo.FORMAT_RGB24, 1000, 1000) as surface:
-            print("Rendering paths...")
-            # perform initial transformations
-            context = cairo.Context(surface)
-            context.scale(1000, 1000)
-            context.fill()
-            context.translate(0.5, 0.5)
-            context.scale(1, -1)
-            context.scale(camera_zoom, camera_zoom)
-            context.translate(-camera_position.x, -camera_position.y)
-
-            # render each propagated path
+        surface = cairo.ImageSurface(cairo.FORMAT_RGB24, size, size)
+        print("Rendering paths...")
+        # perform initial transformations
+        context = cairo.Context(surface)
+        context.scale(size, size)
+        context.fill()
+        context.translate(0.5, 0.5)
+        context.scale(1, -1)
+        context.scale(camera_zoom, camera_zoom)
+        context.translate(-camera_position.x, -camera_position.y)
+
+        # render each propagated path
+        if levels is None:
             for path in multipath:
                 for point in path:
                     context.line_to(point.x, point.y)
@@ -47,44 +70,175 @@ try:
                 context.set_line_join(cairo.LINE_JOIN_ROUND)
                 context.set_line_cap(cairo.LINE_CAP_ROUND)
                 context.stroke()
-
-            # render interferers
-            for interferer in system.interferers:
-                for point in interferer.points:
-                    context.line_to(point.x, point.y)
-                context.close_path()
-                context.set_source_rgb(
-                    1,
-                    max(1 - interferer.hits / 100 * red_factor, 0),
-                    max(1 - interferer.hits / 100 * red_factor, 0),
-                )
-                context.set_line_width(0.05 * ui_size)
-                context.set_line_join(cairo.LINE_JOIN_ROUND)
-                context.set_line_cap(cairo.LINE_CAP_ROUND)
+        else:
+            buckets = [[] for level in range(levels)]
+            for path in multipath:
+                buckets[min(int(path.power * levels), levels - 1)].append(path)
+            context.set_line_width(0.02 * ui_size)
+            context.set_line_join(cairo.LINE_JOIN_ROUND)
+            context.set_line_cap(cairo.LINE_CAP_ROUND)
+            for level, bucket in enumerate(buckets):
+                if len(bucket) == 0:
+                    continue
+                for path in bucket:
+                    context.move_to(path.points[0].x, path.points[0].y)
+                    for point in path.points[1:]:
+                        context.line_to(point.x, point.y)
+                context.set_source_rgba(0, 1, 0, (level + 0.5) / levels)
                 context.stroke()
 
-            # render transmitter
-            context.arc(
-                system.transmitter.position.x, system.transmitter.position.y, 0.1, 0, tau
+        # render interferers
+        for interferer in system.interferers:
+            for point in interferer.points:
+                context.line_to(point.x, point.y)
+            context.close_path()
+            context.set_source_rgb(
+                1,
+                max(1 - interferer.hits / 100 * red_factor, 0),
+                max(1 - interferer.hits / 100 * red_factor, 0),
             )
-            context.set_source_rgb(1, 0, 0)
-            context.fill_preserve()
-            context.set_source_rgb(1, 1, 1)
             context.set_line_width(0.05 * ui_size)
             context.set_line_join(cairo.LINE_JOIN_ROUND)
             context.set_line_cap(cairo.LINE_CAP_ROUND)
             context.stroke()
 
-            # render receiver
-            context.arc(system.receiver.position.x, system.receiver.position.y, 0.1, 0, tau)
-            context.set_source_rgb(0, 0, 1)
-            context.fill_preserve()
-            context.set_source_rgb(1, 1, 1)
-            context.set_line_width(0.05 * ui_size)
-            context.set_line_join(cairo.LINE_JOIN_ROUND)
-            context.set_line_cap(cairo.LINE_CAP_ROUND)
-            context.stroke()
+        # render transmitter
+        context.arc(
+            system.transmitter.position.x, system.transmitter.position.y, 0.1, 0, tau
+        )
+        context.set_source_rgb(1, 0, 0)
+        context.fill_preserve()
+        context.set_source_rgb(1, 1, 1)
+        context.set_line_width(0.05 * ui_size)
+        context.set_line_join(cairo.LINE_JOIN_ROUND)
+        context.set_line_cap(cairo.LINE_CAP_ROUND)
+        context.stroke()
+
+        # render receiver
+        context.arc(system.receiver.position.x, system.receiver.position.y, 0.1, 0, tau)
+        context.set_source_rgb(0, 0, 1)
+        context.fill_preserve()
+        context.set_source_rgb(1, 1, 1)
+        context.set_line_width(0.05 * ui_size)
+        context.set_line_join(cairo.LINE_JOIN_ROUND)
+        context.set_line_cap(cairo.LINE_CAP_ROUND)
+        context.stroke()
+
+        return surface
+
+
+    def save_image(
+        system: System,
+        multipath: Multipath,
+        filename: str,
+        camera_position: Point,
+        camera_zoom: float,
+        ui_size: float = 1,
+        red_factor: float = 1,
+        size: int = 1000,
+        levels: int | None = None,
+        max_paths: int | None = None,
+    ) -> None:
+        """Draws the system and its paths to a png file without opening any window."""
+        count_hits(system, multipath)
+        paths = Multipath(select_paths(multipath, max_paths), multipath.starting_number)
+        with draw(
+            system, paths, camera_position, camera_zoom, ui_size, red_factor, size, levels
+        ) as surface:
+            surface.write_to_png(filename)
+
+
+    def save_tiles(
+        system: System,
+        multipath: Multipath,
+        prefix: str,
+        camera_position: Point,
+        camera_zoom: float,
+        ui_size: float = 1,
+        red_factor: float = 1,
+        size: int = 4096,
+        tile_size: int = 1024,
+        levels: int | None = 32,
+        max_paths: int | None = None,
+    ) -> None:
+        """Draws a large image as square tiles written to <prefix>_<row>_<column>.png, row 0 at the top.
+        Every tile only draws the paths whose bounds overlap it."""
+        count_hits(system, multipath)
+        paths = select_paths(multipath, max_paths)
+        bounds = []
+        for path in paths:
+            xs = [point.x for point in path.points]
+            ys = [point.y for point in path.points]
+            bounds.append((min(xs), min(ys), max(xs), max(ys)))
+        tile_number = -(-size // tile_size)
+        tile_length = tile_size / size / camera_zoom
+        # paths just outside a tile may still reach it with their line width
+        margin = 0.02 * ui_size
+        for row in range(tile_number):
+            for column in range(tile_number):
+                minimum = Point(
+                    camera_position.x - 0.5 / camera_zoom + column * tile_length,
+                    camera_position.y + 0.5 / camera_zoom - (row + 1) * tile_length,
+                )
+                maximum = Point(minimum.x + tile_length, minimum.y + tile_length)
+                tile_paths = [
+                    path
+                    for path, (x_1, y_1, x_2, y_2) in zip(paths, bounds)
+                    if x_1 - margin <= maximum.x
+                    and x_2 + margin >= minimum.x
+                    and y_1 - margin <= maximum.y
+                    and y_2 + margin >= minimum.y
+                ]
+                print(
+                    f"Rendering tiles... ({row * tile_number + column + 1}/{tile_number**2})",
+                    end="\r",
+                )
+                with draw(
+                    system,
+                    Multipath(tile_paths, multipath.starting_number),
+                    Point((minimum.x + maximum.x) / 2, (minimum.y + maximum.y) / 2),
+                    camera_zoom * size / tile_size,
+                    ui_size,
+                    red_factor,
+                    tile_size,
+                    levels,
+                ) as surface:
+                    surface.write_to_png(f"{prefix}_{row}_{column}.png")
+        print()
+
+
+    def render(
+        system: System,
+        multipath: Multipath,
+        camera_position: Point,
+        camera_zoom: float,
+        ui_size: float,
+        bins: int,
+        red_factor: float,
+        levels: int | None = None,
+        max_paths: int | None = None,
+        table_rows: int | None = None,
+    ) -> None:
+        """Displays the paths, their density, the energy time function and a table of paths.
+        For very large multipaths, levels batches the drawing by power, max_paths draws only the paths
+        that contribute the most power and table_rows lists only the strongest paths."""
+        import matplotlib.pyplot as plt
+        import numpy as np
+        from skimage.draw import line
+        from rich.console import Console
+        from rich.table import Table
 
+        count_hits(system, multipath)
+        paths = select_paths(multipath, max_paths)
+        with draw(
+            system,
+            Multipath(paths, multipath.starting_number),
+            camera_position,
+            camera_zoom,
+            ui_size,
+            red_factor,
+            levels=levels,
+        ) as surface:
             # convert pycairo image to pixel data and later load it in matplotlib
             raw = surface.get_data().tolist()
             counter = 0
@@ -121,12 +275,12 @@ try:
 
         # calculating density by drawing rasterized lines virtually with scipy
         density = np.zeros((100, 100))
-        for path in multipath:
+        for path in paths:
             for point_1, point_2 in pairwise(path):
                 r1, c1 = r_transform(point_1)
                 r2, c2 = r_transform(point_2)
                 rr, cc = line(r1, c1, r2, c2)
-                density[rr, cc] += path.power
+                density[rr, cc] += path.power * path.weight
         density_flat = density.flatten()
         density_low = np.percentile(density_flat, 5)
         density_high = np.percentile(density_flat, 95)
@@ -149,7 +303,7 @@ try:
         fig, ax = plt.subplots()
         ax.hist(
             [path.delay for path in multipath],
-            weights=[path.power for path in multipath],
+            weights=[path.power * path.weight for path in multipath],
             bins=bins,
             rwidth=0.95,
         )
@@ -171,18 +325,36 @@ try:
         table.add_column("Hits")
         table.add_column("Relative power")
         table.add_column("Delay")
+        table.add_column("Weight")
+        table.add_column("Delay spread")
 
-        for p, path in enumerate(multipath):
+        if table_rows is None:
+            rows = enumerate(multipath)
+        else:
+            rows = nlargest(
+                table_rows, enumerate(multipath), key=lambda row: row[1].power * row[1].weight
+            )
+        for p, path in rows:
             table.add_row(
-                f"{p + 1}", f"{len(path.hits)}", f"{path.power:.5f}", f"{path.delay:.2E}"
+                f"{p + 1}",
+                f"{len(path.hits)}",
+                f"{path.power:.5f}",
+                f"{path.delay:.2E}",
+                f"{path.weight}",
+                f"{path.delay_spread:.2E}",
             )
+        if table_rows is not None and len(multipath.paths) > table_rows:
+            weaker_number = len(multipath.paths) - table_rows
+            table.add_row(f"... {weaker_number} weaker paths", "", "", "", "", "")
 
         print("Done, displaying results...\n")
         sleep(1)
+        propagated_number = sum(path.weight for path in multipath)
         print(f"Total number of paths: {multipath.starting_number}")
-        print(f"Number of propagated paths: {len(multipath.paths)}")
+        print(f"Number of propagated paths: {propagated_number}")
+        print(f"Number of distinct paths: {len(multipath.paths)}")
         print(
-            f"Propagation rate: {100 * (len(multipath.paths) / multipath.starting_number):.2f}%"
+            f"Propagation rate: {100 * (propagated_number / multipath.starting_number):.2f}%"
         )
         if len(multipath.paths) > 0:
             print(f"Shortest path time: {min(path.delay for path in multipath)} seconds")
@@ -192,6 +364,48 @@ try:
         plt.show()
 
 
+    def render_statistics(system: System, statistics: Statistics) -> None:
+        """Displays the energy time function and totals accumulated without keeping paths."""
+        import matplotlib.pyplot as plt
+        from rich.console import Console
+        from rich.table import Table
+
+        edges = statistics.bin_edges()
+        fig, ax = plt.subplots()
+        ax.stairs(statistics.bin_powers(), edges, fill=True)
+        ax.set_xlabel("Time")
+        ax.set_ylabel("Relative Signal Energy Rate")
+        ax.set_title("Energy function of propagated waves")
+
+        # creating reflection order and interferer tables
+        table = Table(title="Reflection orders")
+        table.add_column("Reflections")
+        table.add_column("Paths")
+        for order, number in enumerate(statistics.orders):
+            if number > 0:
+                table.add_row(f"{order}", f"{number}")
+        interferer_table = Table(title="Most hit interferers")
+        interferer_table.add_column("Interferer")
+        interferer_table.add_column("Hits")
+        ranked = sorted(enumerate(statistics.hits), key=lambda hit: hit[1], reverse=True)
+        for i, hits in ranked[:10]:
+            interferer_table.add_row(f"{i + 1}", f"{hits}")
+
+        print(f"Total number of paths: {statistics.starting_number}")
+        print(f"Number of propagated paths: {statistics.number}")
+        print(
+            f"Propagation rate: {100 * (statistics.number / statistics.starting_number):.2f}%"
+        )
+        print(f"Total relative power: {statistics.power():.5f}")
+        if statistics.number > 0:
+            print(f"Shortest path time: {statistics.delay_minimum} seconds")
+            print(f"Longest path time: {statistics.delay_maximum} seconds")
+        console = Console()
+        console.print(table)
+        console.print(interferer_table)
+        plt.show()
+
+
     if __name__ == "__main__":
         print("This file is a utility program that does not work on its own.")
         sleep(5)
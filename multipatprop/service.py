@@ -0,0 +1,186 @@
+"""A local asynchronous tracing service that keeps scenes warm in its worker processes.
+
+Clients connect over tcp and send one json message per line, either {"jobs": [job, ...]} or {"cancel": id}.
+A job holds an "id", a "scene" file, optionally a "transmitter" and "receiver" position as [x, y],
+the trace parameters of System.get_multipath, an optional "backend" and optional "statistics"
+with "bins" and "max_delay". Every job is answered with one line as soon as it is done."""
+from __future__ import annotations
+
+try:
+    import argparse
+    import asyncio
+    import json
+    from collections import OrderedDict
+    from concurrent.futures import ProcessPoolExecutor
+    from time import perf_counter
+    from multipatprop import System, Transmitter, Receiver, Point
+    from distributed import WorkUnit
+    from cli import describe
+
+    # longest message line, answers with every path of a large multipath are long
+    LINE_LIMIT = 2**28
+
+    # systems loaded by the worker process, least recently used first
+    scene_cache: OrderedDict[tuple[str, str], System] = OrderedDict()
+
+
+    def get_system(scene: str, backend: str, cache_size: int) -> System:
+        """Finds the system of a scene file in the cache of the worker process, loading it if missing."""
+        key = (scene, backend)
+        if key in scene_cache:
+            scene_cache.move_to_end(key)
+            return scene_cache[key]
+        system = System.load(scene, backend)
+        scene_cache[key] = system
+        if len(scene_cache) > cache_size:
+            scene_cache.popitem(last=False)
+        return system
+
+
+    def run_job(job: dict, cache_size: int) -> dict:
+        """Traces one job in a worker process and describes its result."""
+        start = perf_counter()
+        scene = get_system(job["scene"], job.get("backend", "python"), cache_size)
+        # jobs move the transmitter and receiver around the same interferers
+        transmitter = scene.transmitter
+        receiver = scene.receiver
+        if "transmitter" in job:
+            transmitter = Transmitter(Point(*job["transmitter"]))
+        if "receiver" in job:
+            receiver = Receiver(Point(*job["receiver"]))
+        system = System(transmitter, receiver, scene.interferers, scene.backend)
+        load_time = perf_counter() - start
+        unit = WorkUnit(
+            job["scene"],
+            job["starting_number"],
+            0,
+            job["starting_number"],
+            job["receiver_diameter"],
+            job["max_reflections"],
+            job.get("power_multiplier", 0.9),
+            scene.backend,
+            job.get("statistics"),
+        )
+        partial = unit.run(system)
+        if partial.statistics is not None:
+            result = describe(partial.statistics, system)
+        else:
+            result = describe(partial.multipath, system)
+        trace_time = perf_counter() - start - load_time
+        return {"result": result, "load_time": load_time, "trace_time": trace_time}
+
+
+    def check(message) -> str | None:
+        """Finds what is wrong with a decoded message, None if it can be handled."""
+        if not isinstance(message, dict):
+            return "Messages must be json objects with jobs or an id to cancel"
+        jobs = message.get("jobs", [])
+        if not isinstance(jobs, list) or not all(isinstance(job, dict) for job in jobs):
+            return "Jobs must be a list of json objects"
+        # ids are keys of the running tasks
+        ids = [job.get("id") for job in jobs] + [message.get("cancel")]
+        if any(isinstance(id, (list, dict)) for id in ids):
+            return "Ids must be strings or numbers"
+        return None
+
+
+    class Service:
+        """Accepts jobs over local connections and traces them on a process pool."""
+
+        executor: ProcessPoolExecutor
+        cache_size: int
+
+        def __init__(self, processes: int | None = None, cache_size: int = 8) -> None:
+            self.executor = ProcessPoolExecutor(processes)
+            self.cache_size = cache_size
+
+        async def run(
+            self, job: dict, future: asyncio.Future, writer: asyncio.StreamWriter
+        ) -> None:
+            """Waits for the traced job and writes its answer with the time it waited, loaded, traced and took in total.
+            Cancelling the future instead of this task answers a cancelled job, however early it is cancelled."""
+            start = perf_counter()
+            try:
+                answer = await future
+                answer["queue_time"] = (
+                    perf_counter() - start - answer["load_time"] - answer["trace_time"]
+                )
+            except asyncio.CancelledError:
+                # a job already running in a worker finishes there but is not answered with a result
+                answer = {"cancelled": True}
+            except Exception as e:
+                answer = {"error": f"{type(e).__name__}: {e}"}
+            answer["id"] = job.get("id")
+            answer["total_time"] = perf_counter() - start
+            writer.write((json.dumps(answer) + "\n").encode())
+            await writer.drain()
+
+        async def handle(
+            self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+        ) -> None:
+            """Reads messages of one connection until it closes, answering every job exactly once."""
+            futures = {}
+            tasks = set()
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError as e:
+                    writer.write((json.dumps({"error": str(e)}) + "\n").encode())
+                    continue
+                error = check(message)
+                if error is not None:
+                    writer.write((json.dumps({"error": error}) + "\n").encode())
+                    continue
+                if "cancel" in message and message["cancel"] in futures:
+                    futures[message["cancel"]].cancel()
+                for job in message.get("jobs", []):
+                    future = asyncio.wrap_future(
+                        self.executor.submit(run_job, job, self.cache_size)
+                    )
+                    futures[job.get("id")] = future
+                    task = asyncio.create_task(self.run(job, future, writer))
+                    tasks.add(task)
+
+                    def forget(task: asyncio.Task, id=job.get("id"), future=future) -> None:
+                        tasks.discard(task)
+                        if futures.get(id) is future:
+                            del futures[id]
+
+                    task.add_done_callback(forget)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+        async def serve(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+            server = await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT)
+            print(f"Serving on {host}:{port}")
+            async with server:
+                await server.serve_forever()
+
+
+    async def submit(
+        jobs: list[dict], host: str = "127.0.0.1", port: int = 8765
+    ) -> list[dict]:
+        """Sends a batch of jobs to a running service and waits for every answer."""
+        reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        writer.write((json.dumps({"jobs": jobs}) + "\n").encode())
+        await writer.drain()
+        answers = []
+        while len(answers) < len(jobs):
+            answers.append(json.loads(await reader.readline()))
+        writer.close()
+        await writer.wait_closed()
+        return answers
+
+
+    if __name__ == "__main__":
+        parser = argparse.ArgumentParser(description="Run the local tracing service.")
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--processes", type=int)
+        parser.add_argument("--cache-size", type=int, default=8)
+        options = parser.parse_args()
+        service = Service(options.processes, options.cache_size)
+        asyncio.run(service.serve(options.host, options.port))
+except KeyboardInterrupt:
+    exit()
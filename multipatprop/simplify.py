@@ -0,0 +1,194 @@
+"""Geometry level of detail, simplifies interferers to a maximum deviation and reports the effect on the multipath."""
+from __future__ import annotations
+
+try:
+    from math import hypot, sqrt
+    from time import perf_counter
+    from multipatprop import System, Interferer, Multipath, Point
+
+
+    def deviation(point: Point, start: Point, end: Point) -> float:
+        """Finds the distance between a point and the segment from start to end."""
+        vx = end.x - start.x
+        vy = end.y - start.y
+        length = vx * vx + vy * vy
+        u = 0
+        if length > 0:
+            u = min(max(((point.x - start.x) * vx + (point.y - start.y) * vy) / length, 0), 1)
+        return hypot(point.x - start.x - u * vx, point.y - start.y - u * vy)
+
+
+    def simplify_chain(points: list[Point], max_deviation: float) -> list[Point]:
+        """Keeps the ends of a chain of points and only the points needed to stay within max_deviation of it,
+        so runs of nearly collinear segments are merged into one (Ramer-Douglas-Peucker)."""
+        keep = [False] * len(points)
+        keep[0] = keep[-1] = True
+        stack = [(0, len(points) - 1)]
+        while stack:
+            first, last = stack.pop()
+            farthest = None
+            farthest_deviation = max_deviation
+            for p in range(first + 1, last):
+                d = deviation(points[p], points[first], points[last])
+                if d > farthest_deviation:
+                    farthest = p
+                    farthest_deviation = d
+            if farthest is not None:
+                keep[farthest] = True
+                stack.append((first, farthest))
+                stack.append((farthest, last))
+        return [point for point, kept in zip(points, keep) if kept]
+
+
+    def simplify_points(points: list[Point], max_deviation: float, closed: bool) -> list[Point]:
+        """Finds the points of an outline that stays within max_deviation of the outline through points."""
+        if len(points) <= 3:
+            return [point.copy() for point in points]
+        if not closed:
+            return [point.copy() for point in simplify_chain(points, max_deviation)]
+        # a closed outline is split in two chains at the point farthest from the first point
+        farthest = max(
+            range(len(points)),
+            key=lambda p: hypot(points[p].x - points[0].x, points[p].y - points[0].y),
+        )
+        chain_1 = simplify_chain(points[: farthest + 1], max_deviation)
+        chain_2 = simplify_chain(points[farthest:] + [points[0]], max_deviation)
+        outline = chain_1 + chain_2[1:-1]
+        if len(outline) < 3:
+            return [point.copy() for point in points]
+        return [point.copy() for point in outline]
+
+
+    def simplify_interferer(interferer: Interferer, max_deviation: float) -> Interferer:
+        """Create an interferer whose outline stays within max_deviation of the outline of an interferer."""
+        points = simplify_points(interferer.points, max_deviation, interferer.closed)
+        return Interferer(points, interferer.closed)
+
+
+    def count_segments(system: System) -> int:
+        """Counts the segments of the interferers of a system, instanced interferers are counted by their templates."""
+        interferers = system.interferers
+        if hasattr(interferers, "templates"):
+            return sum(
+                len(interferers.templates[t].segments) for t in interferers.template_indices
+            )
+        return sum(len(interferer.segments) for interferer in interferers)
+
+
+    def simplify_system(system: System, max_deviation: float) -> System:
+        """Create a system with every interferer simplified to max_deviation and print the segment reduction.
+        Instanced interferers stay instanced, each template is simplified so that its largest instance stays within max_deviation."""
+        if hasattr(system.interferers, "templates"):
+            from instances import InstancedInterferers, Template
+
+            instances = system.interferers
+            templates = []
+            for t, template in enumerate(instances.templates):
+                scales = instances.scales[instances.template_indices == t]
+                scale = float(scales.max()) if len(scales) > 0 else 1
+                points = [Point(x, y) for x, y in template.points.tolist()]
+                points = simplify_points(points, max_deviation / scale, template.closed)
+                points = [(point.x, point.y) for point in points]
+                templates.append(Template(points, template.closed))
+            interferers = InstancedInterferers(
+                templates,
+                instances.template_indices,
+                instances.positions,
+                instances.rotations,
+                instances.scales,
+            )
+        else:
+            interferers = [
+                simplify_interferer(interferer, max_deviation) for interferer in system.interferers
+            ]
+        simplified = System(system.transmitter, system.receiver, interferers, system.backend)
+        segment_number = count_segments(system)
+        simplified_number = count_segments(simplified)
+        print(
+            f"Simplified {segment_number} segments to {simplified_number} "
+            f"({simplified_number / max(segment_number, 1):.1%}, max deviation: {max_deviation})"
+        )
+        return simplified
+
+
+    def compare(reference: Multipath, multipath: Multipath) -> dict:
+        """Compares a multipath to a reference multipath by propagated number, received power and delays.
+        Aggregated paths count with their weight, the delay spread is the power weighted standard deviation of delays."""
+        results = {}
+        for name, result in (("reference", reference), ("simplified", multipath)):
+            paths = list(result)
+            power = sum(path.power * path.weight for path in paths)
+            mean_delay = 0
+            delay_spread = 0
+            if power > 0:
+                mean_delay = sum(path.delay * path.power * path.weight for path in paths) / power
+                delay_spread = sqrt(
+                    sum(
+                        ((path.delay - mean_delay) ** 2 + path.delay_spread**2)
+                        * path.power
+                        * path.weight
+                        for path in paths
+                    )
+                    / power
+                )
+            results[name] = {
+                "propagated_number": sum(path.weight for path in paths),
+                # power per starting path, so that multipaths of different starting numbers compare
+                "power": power / max(result.starting_number, 1),
+                "mean_delay": mean_delay,
+                "delay_spread": delay_spread,
+            }
+        reference_power = results["reference"]["power"]
+        results["power_error"] = (
+            abs(results["simplified"]["power"] - reference_power) / reference_power
+            if reference_power > 0
+            else 0
+        )
+        results["mean_delay_error"] = abs(
+            results["simplified"]["mean_delay"] - results["reference"]["mean_delay"]
+        )
+        results["delay_spread_error"] = abs(
+            results["simplified"]["delay_spread"] - results["reference"]["delay_spread"]
+        )
+        return results
+
+
+    def report(
+        system: System,
+        max_deviation: float,
+        starting_number: int,
+        receiver_diameter: float,
+        max_reflections: int,
+        power_multiplier: float = 0.9,
+    ) -> dict:
+        """Traces a system and its simplification with the same settings and reports the segment reduction,
+        the speedup and the effect on the multipath, see compare."""
+        simplified = simplify_system(system, max_deviation)
+        start = perf_counter()
+        reference = system.get_multipath(
+            starting_number, receiver_diameter, max_reflections, power_multiplier
+        )
+        reference_time = perf_counter() - start
+        start = perf_counter()
+        multipath = simplified.get_multipath(
+            starting_number, receiver_diameter, max_reflections, power_multiplier
+        )
+        simplified_time = perf_counter() - start
+        results = compare(reference, multipath)
+        results["segment_number"] = count_segments(system)
+        results["simplified_segment_number"] = count_segments(simplified)
+        results["speedup"] = reference_time / simplified_time if simplified_time > 0 else 0
+        print(
+            f"Speedup: {results['speedup']:.2f}, power error: {results['power_error']:.2%}, "
+            f"mean delay error: {results['mean_delay_error']:.3g} s, "
+            f"delay spread error: {results['delay_spread_error']:.3g} s"
+        )
+        return results
+
+
+    if __name__ == "__main__":
+        from time import sleep
+        print("This file is just a library, does not work on its own.")
+        sleep(5)
+except KeyboardInterrupt:
+    exit()
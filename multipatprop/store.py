@@ -0,0 +1,187 @@
+"""An append only columnar store of propagated paths on disk, read back through memory maps."""
+from __future__ import annotations
+
+try:
+    import json
+    import os
+    from typing import Callable, Iterable, Iterator
+    import numpy as np
+    from multipatprop import System, Multipath, Path, Point, Interferer, Segment
+
+    # column files of a store and the type and width of their rows
+    COLUMNS = {
+        "points": (np.float64, 2),
+        "ends": (np.int64, 1),
+        "segments": (np.int64, 2),
+        "delays": (np.float64, 1),
+        "powers": (np.float64, 1),
+        "weights": (np.int64, 1),
+        "delay_spreads": (np.float64, 1),
+        "past_receivers": (np.int64, 1),
+    }
+
+    # columns added after the first stores were written and their value for paths of those stores
+    DEFAULTS = {"past_receivers": 1}
+
+
+    class MultipathWriter:
+        """Streams paths into the column files of a store directory, appending to the store if it exists."""
+
+        directory: str
+        system: System
+        starting_number: int
+        point_number: int
+        buffer_size: int
+        buffers: dict[str, list]
+        segment_index: Callable[[Interferer, Segment], tuple[int, int]]
+
+        def __init__(self, directory: str, system: System, buffer_size: int = 10000) -> None:
+            self.directory = directory
+            self.system = system
+            self.buffer_size = buffer_size
+            self.buffers = {column: [] for column in COLUMNS}
+            self.segment_index = system.get_segment_index()
+            os.makedirs(directory, exist_ok=True)
+            self.starting_number = 0
+            self.point_number = 0
+            header = os.path.join(directory, "header.json")
+            if os.path.exists(header):
+                with open(header) as file:
+                    self.starting_number = json.load(file)["starting_number"]
+                # two float64 coordinates per point
+                self.point_number = os.path.getsize(os.path.join(directory, "points.bin")) // 16
+                path_number = os.path.getsize(os.path.join(directory, "ends.bin")) // 8
+                for column, value in DEFAULTS.items():
+                    filename = os.path.join(directory, f"{column}.bin")
+                    if not os.path.exists(filename):
+                        dtype, width = COLUMNS[column]
+                        with open(filename, "wb") as file:
+                            file.write(np.full((path_number, width), value, dtype=dtype).tobytes())
+
+        def __enter__(self) -> MultipathWriter:
+            return self
+
+        def __exit__(self, *args) -> None:
+            self.close()
+
+        def write(self, path: Path) -> None:
+            """Appends one path, hit segments are stored as indices into the interferers of the system."""
+            for point in path.points:
+                self.buffers["points"].append((point.x, point.y))
+            self.point_number += len(path.points)
+            self.buffers["ends"].append(self.point_number)
+            for hit, segment in zip(path.hits, path.segments):
+                self.buffers["segments"].append(self.segment_index(hit, segment))
+            self.buffers["delays"].append(path.delay)
+            self.buffers["powers"].append(path.power)
+            self.buffers["weights"].append(path.weight)
+            self.buffers["delay_spreads"].append(path.delay_spread)
+            self.buffers["past_receivers"].append(int(path.past_receiver))
+            if len(self.buffers["ends"]) >= self.buffer_size:
+                self.flush()
+
+        def write_multipath(self, multipath: Multipath) -> None:
+            """Appends every path of a multipath and counts its starting paths."""
+            for path in multipath:
+                self.write(path)
+            self.starting_number += multipath.starting_number
+
+        def write_traced(self, traced: Iterable[tuple[float, Path | None]]) -> None:
+            """Appends the propagated paths of traced starting angles as they are found, see System.get_paths."""
+            for starting_angle, path in traced:
+                if path is not None:
+                    self.write(path)
+                self.starting_number += 1
+
+        def flush(self) -> None:
+            """Appends the buffered rows to the column files and updates the header."""
+            for column, (dtype, width) in COLUMNS.items():
+                rows = np.array(self.buffers[column], dtype=dtype).reshape(-1, width)
+                with open(os.path.join(self.directory, f"{column}.bin"), "ab") as file:
+                    file.write(rows.tobytes())
+                self.buffers[column] = []
+            header = {"starting_number": self.starting_number, "scene": self.system.to_dict()}
+            with open(os.path.join(self.directory, "header.json"), "w") as file:
+                json.dump(header, file)
+
+        def close(self) -> None:
+            self.flush()
+
+
+    class StoredPaths:
+        """A read only sequence of the paths of a store, every path is built from the memory maps when accessed."""
+
+        system: System
+        columns: dict[str, np.ndarray]
+
+        def __init__(self, system: System, columns: dict[str, np.ndarray]) -> None:
+            self.system = system
+            self.columns = columns
+
+        def __len__(self) -> int:
+            return len(self.columns["ends"])
+
+        def __getitem__(self, p: int) -> Path:
+            if p < 0:
+                p += len(self)
+            if not 0 <= p < len(self):
+                raise IndexError("Path index out of range")
+            end = int(self.columns["ends"][p, 0])
+            start = int(self.columns["ends"][p - 1, 0]) if p > 0 else 0
+            # every path has two more points than hits, the transmitter and the receiver
+            points = [Point(x, y) for x, y in self.columns["points"][start:end].tolist()]
+            hits = []
+            segments = []
+            for i, s in self.columns["segments"][start - 2 * p : end - 2 * (p + 1)].tolist():
+                hits.append(self.system.interferers[i])
+                segments.append(self.system.interferers[i].segments[s])
+            path = Path(points, hits, 1, segments)
+            path.delay = float(self.columns["delays"][p, 0])
+            path.power = float(self.columns["powers"][p, 0])
+            path.weight = int(self.columns["weights"][p, 0])
+            path.delay_spread = float(self.columns["delay_spreads"][p, 0])
+            path.past_receiver = bool(self.columns["past_receivers"][p, 0])
+            return path
+
+        def __iter__(self) -> Iterator[Path]:
+            for p in range(len(self)):
+                yield self[p]
+
+
+    class StoredMultipath(Multipath):
+        """A multipath read from a store, its paths stay on disk and the columns are available as arrays."""
+
+        paths: StoredPaths
+        system: System
+        delays: np.ndarray
+        powers: np.ndarray
+        weights: np.ndarray
+
+        def __init__(self, directory: str, system: System | None = None) -> None:
+            with open(os.path.join(directory, "header.json")) as file:
+                header = json.load(file)
+            if system is None:
+                system = System.from_dict(header["scene"])
+            self.system = system
+            columns = {}
+            for column, (dtype, width) in COLUMNS.items():
+                filename = os.path.join(directory, f"{column}.bin")
+                if not os.path.exists(filename):
+                    path_number = os.path.getsize(os.path.join(directory, "ends.bin")) // 8
+                    columns[column] = np.full((path_number, width), DEFAULTS[column], dtype=dtype)
+                elif os.path.getsize(filename) == 0:
+                    columns[column] = np.empty((0, width), dtype=dtype)
+                else:
+                    columns[column] = np.memmap(filename, dtype=dtype, mode="r").reshape(-1, width)
+            super().__init__(StoredPaths(system, columns), header["starting_number"])
+            self.delays = columns["delays"][:, 0]
+            self.powers = columns["powers"][:, 0]
+            self.weights = columns["weights"][:, 0]
+
+
+    if __name__ == "__main__":
+        from time import sleep
+        print("This file is just a library, does not work on its own.")
+        sleep(5)
+except KeyboardInterrupt:
+    exit()